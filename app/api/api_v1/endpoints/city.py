@@ -5,46 +5,136 @@ from fastapi import (
     Path,
     Body,
     HTTPException,
+    Request,
+    Response,
     status,
 )
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo.errors import DuplicateKeyError
 
-from ....db.dependencies import get_mongodb_conn_for_city
-from ....models.city import ViewCity, UpdateCity
+from ....cache.manager import cache_manager
+from ....core.compression import PrecompressedCache, negotiate_encoding
+from ....core.config import (
+    BROTLI_QUALITY,
+    BULK_BATCH_SIZE,
+    CITY_BATCH_MAX_SLUGS,
+    COMPRESSION_MINIMUM_SIZE,
+    EXPORT_BATCH_SIZE,
+    GZIP_LEVEL,
+    TOP_PAGE_CACHE_SIZE,
+    TOP_PAGE_CACHE_TTL,
+)
+from ....core.etag import (
+    encoded_etag,
+    etag_matches,
+    not_modified,
+    page_etag,
+    set_etag,
+    version_etag,
+)
+from ....core.pagination import InvalidCursor
+from ....core.records import encode_ndjson, iter_list, iter_ndjson
+from ....crud.bulk import import_cities
+from ....crud.sight import get_city_with_sights
+from ....core.responses import TrustedResponseRoute, render_json
+from ....db.base import with_primary
+from ....db.dependencies import get_mongodb_conn_for_city, get_read_conn_for_city
+from ....models.bulk import BulkReport
+from ....models.city import (
+    CITY_SUMMARY_FIELDS,
+    CityBatch,
+    CitySummary,
+    ViewCity,
+    UpdateCity,
+)
 from ....models.shortcuts import (
     ADDITIONAL_CONFLICT_CITY_SCHEMA,
     ADDITIONAL_NOT_FOUND_CITY_SCHEMA,
+    ADDITIONAL_INVALID_CURSOR_OR_FIELDS_SCHEMA,
+    ADDITIONAL_INVALID_FIELDS_SCHEMA,
+    ADDITIONAL_INVALID_BULK_BODY_SCHEMA,
+    ADDITIONAL_INVALID_BATCH_OR_FIELDS_SCHEMA,
 )
 from ....crud.city import (
+    city_list_cursor,
+    city_rating_cursor,
+    city_summary_projection,
     get_all_cities,
     insert_city_and_return,
     get_city_by_slug,
     update_city_and_return,
     delete_city_and_return,
     get_cities_by_rating,
+    get_cities_by_slugs,
+    get_rating_page_versions,
+    iter_all_cities,
+)
+
+top_page_cache = PrecompressedCache(
+    cache_manager.loader(
+        "top_page", maxsize=TOP_PAGE_CACHE_SIZE, ttl=TOP_PAGE_CACHE_TTL
+    ),
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
 )
 
 router = APIRouter(
     prefix="/cities",
     tags=["cities"],
+    route_class=TrustedResponseRoute,
 )
 
 
+async def get_summary_projection(
+    fields: str = Query(None, description="Comma separated list of fields")
+) -> dict:
+    if not fields:
+        return city_summary_projection()
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if unknown := set(requested) - set(CITY_SUMMARY_FIELDS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return city_summary_projection(requested)
+
+
 @router.get(
     "/",
-    response_model=list[ViewCity],
+    response_model=list[CitySummary],
+    response_model_exclude_unset=True,
     response_description="List all cities",
+    responses=ADDITIONAL_INVALID_CURSOR_OR_FIELDS_SCHEMA,
 )
 async def list_all_cities(
+    response: Response,
     limit: int = Query(20, gt=0),
     skip: int = Query(0, ge=0),
     search: str = Query(None),
-    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
+    prefix: str = Query(None, min_length=1),
+    cursor: str = Query(None),
+    projection: dict = Depends(get_summary_projection),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
 ):
-    return await get_all_cities(
-        collection=collection, limit=limit, skip=skip, search=search
-    )
+    try:
+        cities = await get_all_cities(
+            collection=collection,
+            limit=limit,
+            skip=skip,
+            search=search,
+            cursor=cursor,
+            prefix=prefix,
+            projection=projection,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if len(cities) == limit and not (search or prefix):
+        response.headers["X-Next-Cursor"] = city_list_cursor(cities[-1])
+    return cities
 
 
 @router.post(
@@ -68,17 +158,178 @@ async def add_city(
     return res
 
 
+@router.post(
+    "/bulk",
+    response_model=BulkReport,
+    response_description="Import cities in bulk",
+    responses=ADDITIONAL_INVALID_BULK_BODY_SCHEMA,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": ViewCity.schema()}
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def add_cities_in_bulk(
+    request: Request,
+    batch_size: int = Query(BULK_BATCH_SIZE, gt=0, le=10000),
+    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
+):
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        records = iter_ndjson(request.stream())
+    else:
+        try:
+            body = await request.json()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array or NDJSON body",
+            ) from e
+        if not isinstance(body, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array or NDJSON body",
+            )
+        records = iter_list(body)
+    return await import_cities(
+        collection=collection, records=records, batch_size=batch_size
+    )
+
+
 @router.get(
     "/top",
-    response_model=list[ViewCity],
+    response_model=list[CitySummary],
+    response_model_exclude_unset=True,
     response_description="Get the most rated cities",
+    responses=ADDITIONAL_INVALID_CURSOR_OR_FIELDS_SCHEMA,
 )
 async def get_city_rating(
+    request: Request,
     limit: int = Query(20, gt=0),
     skip: int = Query(0, ge=0),
-    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
+    cursor: str = Query(None),
+    projection: dict = Depends(get_summary_projection),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
+):
+    try:
+        versions = await get_rating_page_versions(
+            collection=collection, limit=limit, skip=skip, cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    etag = page_etag(versions)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    async def render() -> tuple[bytes, dict]:
+        # The rendered page is shared, so it is read from the primary
+        cities = await get_cities_by_rating(
+            collection=with_primary(collection),
+            limit=limit,
+            skip=skip,
+            cursor=cursor,
+            projection=projection,
+        )
+        headers = {}
+        if len(cities) == limit:
+            headers["X-Next-Cursor"] = city_rating_cursor(collection, cities[-1])
+        return render_json(list[CitySummary], cities, exclude_unset=True), headers
+
+    # The page tag covers ids and versions; limit and fields shape the body
+    key = f"{collection.name}:{etag}:{limit}:{','.join(projection or ())}"
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    body, headers, encoding = await top_page_cache.get_or_render(key, encoding, render)
+    response = Response(body, media_type="application/json", headers=headers)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        etag = encoded_etag(etag, encoding)
+    set_etag(response, etag)
+    return response
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    response_description="Export cities as NDJSON",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        **ADDITIONAL_INVALID_FIELDS_SCHEMA,
+    },
+)
+async def export_cities(
+    search: str = Query(None),
+    prefix: str = Query(None, min_length=1),
+    gzip: bool = Query(False),
+    projection: dict = Depends(get_summary_projection),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
 ):
-    return await get_cities_by_rating(collection=collection, limit=limit, skip=skip)
+    cities = iter_all_cities(
+        collection=collection,
+        batch_size=EXPORT_BATCH_SIZE,
+        search=search,
+        prefix=prefix,
+        projection=projection,
+    )
+    return StreamingResponse(
+        encode_ndjson(
+            cities, fields=projection, lines_per_chunk=EXPORT_BATCH_SIZE, gzip=gzip
+        ),
+        media_type="application/x-ndjson",
+        headers={"Content-Encoding": "gzip"} if gzip else None,
+    )
+
+
+async def get_city_batch(
+    slugs: list[str], projection: dict, collection: AsyncIOMotorCollection
+) -> dict:
+    slugs = list(dict.fromkeys(slug.strip() for slug in slugs if slug.strip()))
+    if len(slugs) > CITY_BATCH_MAX_SLUGS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {CITY_BATCH_MAX_SLUGS} slugs per batch",
+        )
+    cities, missing = await get_cities_by_slugs(
+        collection=collection, slugs=slugs, projection=projection
+    )
+    return {"cities": cities, "missing": missing}
+
+
+@router.get(
+    "/batch",
+    response_model=CityBatch,
+    response_model_exclude_unset=True,
+    response_description="Get cities by a list of slugs",
+    responses=ADDITIONAL_INVALID_BATCH_OR_FIELDS_SCHEMA,
+)
+async def get_cities_batch(
+    slugs: str = Query(..., description="Comma separated list of slugs"),
+    projection: dict = Depends(get_summary_projection),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
+):
+    return await get_city_batch(slugs.split(","), projection, collection)
+
+
+@router.post(
+    "/batch",
+    response_model=CityBatch,
+    response_model_exclude_unset=True,
+    response_description="Get cities by a list of slugs",
+    responses=ADDITIONAL_INVALID_BATCH_OR_FIELDS_SCHEMA,
+)
+async def post_cities_batch(
+    slugs: list[str] = Body(..., example=["moscow", "saint-petersburg"]),
+    projection: dict = Depends(get_summary_projection),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
+):
+    return await get_city_batch(slugs, projection, collection)
 
 
 @router.get(
@@ -88,11 +339,17 @@ async def get_city_rating(
     responses=ADDITIONAL_NOT_FOUND_CITY_SCHEMA,
 )
 async def get_city(
+    request: Request,
+    response: Response,
     slug: str = Path(..., min_length=1),
     collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
 ):
     if city := await get_city_by_slug(collection=collection, slug=slug):
-        return city
+        etag = version_etag(city["_id"], city.get("version", 0))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        return await get_city_with_sights(collection=collection, city=city)
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND, detail=f"City '{slug}' was not found"
     )
@@ -5,14 +5,20 @@ from fastapi import (
     Path,
     Body,
     HTTPException,
+    Request,
+    Response,
     status,
 )
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo.errors import DuplicateKeyError
 
-from ....db.dependencies import get_mongodb_conn_for_city
+from ....core.etag import etag_matches, not_modified, set_etag, version_etag
+from ....core.responses import TrustedResponseRoute
+from ....crud.city import get_city_version
+from ....db.dependencies import get_mongodb_conn_for_city, get_read_conn_for_city
 from ....models.sight import ViewSight, UpdateSight
 from ....models.shortcuts import (
+    ADDITIONAL_NOT_FOUND_CITY_SCHEMA,
     ADDITIONAL_CONFLICT_SIGHT_SCHEMA,
     ADDITIONAL_NOT_FOUND_SIGHT_SCHEMA,
 )
@@ -24,10 +30,10 @@ from ....crud.sight import (
     delete_sight_and_return,
 )
 
-
 router = APIRouter(
     prefix="/cities",
     tags=["sights"],
+    route_class=TrustedResponseRoute,
 )
 
 
@@ -35,15 +41,31 @@ router = APIRouter(
     "/{city}/sights",
     response_model=list[ViewSight],
     response_description="List all corresponding sights",
+    responses=ADDITIONAL_NOT_FOUND_CITY_SCHEMA,
 )
 async def list_sights(
+    request: Request,
+    response: Response,
     city: str = Path(..., min_length=1),
     limit: int = Query(20, gt=0),
     skip: int = Query(0, ge=0),
-    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
 ):
-    return await get_sights_by_city_slug(
+    # Any current version may confirm the client's copy, but the tag sent with a
+    # body comes from the read that produced it, which may be a lagging secondary
+    if version := await get_city_version(collection=collection, slug=city):
+        etag = version_etag(*version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    if page := await get_sights_by_city_slug(
         collection=collection, slug=city, limit=limit, skip=skip
+    ):
+        sights, total, version = page
+        response.headers["X-Total-Count"] = str(total)
+        set_etag(response, version_etag(*version))
+        return sights
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND, detail=f"City '{city}' was not found"
     )
 
 
@@ -52,7 +74,7 @@ async def list_sights(
     response_model=ViewSight,
     status_code=status.HTTP_201_CREATED,
     response_description="Add sight to city",
-    responses=ADDITIONAL_CONFLICT_SIGHT_SCHEMA,
+    responses={**ADDITIONAL_NOT_FOUND_CITY_SCHEMA, **ADDITIONAL_CONFLICT_SIGHT_SCHEMA},
 )
 async def post_sight(
     city: str = Path(..., min_length=1),
@@ -68,6 +90,10 @@ async def post_sight(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Sight '{document.name}' already exists",
         ) from e
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"City '{city}' was not found"
+        )
     return res
 
 
@@ -78,13 +104,21 @@ async def post_sight(
     responses=ADDITIONAL_NOT_FOUND_SIGHT_SCHEMA,
 )
 async def get_sight(
+    request: Request,
+    response: Response,
     city: str = Path(..., min_length=1),
     sight: str = Path(..., min_length=1),
     collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
 ):
+    if version := await get_city_version(collection=collection, slug=city):
+        etag = version_etag(*version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
     if returned_sight := await get_sight_and_return(
         collection=collection, city_slug=city, sight_slug=sight
     ):
+        if version:
+            set_etag(response, etag)
         return returned_sight
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
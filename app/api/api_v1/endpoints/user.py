@@ -1,30 +1,60 @@
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pymongo.errors import DuplicateKeyError
 
-from ....core.security import authenticate_user, create_access_token, get_password_hash
+from ....core.security import (
+    authenticate_refresh_token,
+    authenticate_user,
+    create_refresh_token,
+    create_user_access_token,
+    get_password_hash,
+)
 from ....core.permissions import is_staff
+from ....core.config import USER_EXPAND_MAX_CITIES
+from ....core.responses import TrustedResponseRoute, render_json
 from ....db.dependencies import (
     get_current_active_user,
     get_mongodb_conn_for_user,
+    get_read_conn_for_city,
+    get_read_conn_for_user,
+)
+from ....models.token import RefreshToken, Token
+from ....models.user import ExpandedUser, FullUser, UpdateUser, ViewUser, RegisterUser
+from ....crud.user import (
+    CityListLimitExceeded,
+    create_user,
+    expand_user_cities,
+    get_user_by_username,
+    update_user_and_return,
 )
-from ....models.token import Token
-from ....models.user import FullUser, UpdateUser, ViewUser, RegisterUser
-from ....crud.user import create_user, get_user_by_username, update_user_and_return
 from ....models.shortcuts import (
     ADDITIONAL_CONFLICT_USER_SCHEMA,
     ADDITIONAL_CONFLICT_SIGHT_SCHEMA,
     ADDITIONAL_UNAUTHORIZED_INCORRECT_SCHEMA,
+    ADDITIONAL_UNAUTHORIZED_CREDENTIALS_SCHEMA,
     ADDITIONAL_SUCCESSFUL_CREATED_USER_SCHEMA,
     ADDITIONAL_NOT_FOUND_USER_SCHEMA,
     ADDITIONAL_PERMISSION_SCHEMA,
     ADDITIONAL_INACTIVE_USER_SCHEMA,
+    ADDITIONAL_HASHING_UNAVAILABLE_SCHEMA,
 )
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
+    route_class=TrustedResponseRoute,
 )
 
 
@@ -32,7 +62,10 @@ router = APIRouter(
     "/token",
     response_model=Token,
     response_description="Get token",
-    responses=ADDITIONAL_CONFLICT_SIGHT_SCHEMA,
+    responses={
+        **ADDITIONAL_CONFLICT_SIGHT_SCHEMA,
+        **ADDITIONAL_HASHING_UNAVAILABLE_SCHEMA,
+    },
 )
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -47,8 +80,31 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user["username"]})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": create_user_access_token(user),
+        "refresh_token": create_refresh_token(user),
+        "token_type": "bearer",
+    }
+
+
+@router.post(
+    "/token/refresh",
+    response_model=Token,
+    response_description="Exchange a refresh token for a new access token",
+    responses=ADDITIONAL_UNAUTHORIZED_CREDENTIALS_SCHEMA,
+)
+async def refresh_access_token(
+    form: RefreshToken = Body(...),
+    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_user),
+):
+    user = await authenticate_refresh_token(
+        collection=collection, token=form.refresh_token
+    )
+    return {
+        "access_token": create_user_access_token(user),
+        "refresh_token": form.refresh_token,
+        "token_type": "bearer",
+    }
 
 
 @router.post(
@@ -57,6 +113,7 @@ async def login_for_access_token(
     responses={
         **ADDITIONAL_CONFLICT_USER_SCHEMA,
         **ADDITIONAL_SUCCESSFUL_CREATED_USER_SCHEMA,
+        **ADDITIONAL_HASHING_UNAVAILABLE_SCHEMA,
     },
 )
 async def register_user(
@@ -64,7 +121,7 @@ async def register_user(
     collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_user),
 ):
     user = FullUser(**form.dict())
-    user.password = get_password_hash(user.password)
+    user.password = await get_password_hash(user.password)
     try:
         await create_user(collection=collection, user=user)
     except DuplicateKeyError as e:
@@ -78,15 +135,25 @@ async def register_user(
 @router.get(
     "/users/{username}",
     response_description="Get user profile",
-    response_model=ViewUser,
+    response_model=ViewUser | ExpandedUser,
     responses=ADDITIONAL_NOT_FOUND_USER_SCHEMA,
 )
 async def get_user_profile(
-    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_user),
+    collection: AsyncIOMotorCollection = Depends(get_read_conn_for_user),
+    city_collection: AsyncIOMotorCollection = Depends(get_read_conn_for_city),
     username: str = Path(..., min_length=1),
+    expand: Literal["cities"] = Query(
+        None, description="Inline city summaries instead of slugs"
+    ),
 ):
     if user := await get_user_by_username(collection=collection, username=username):
-        return user
+        if expand != "cities":
+            return user
+        user = await expand_user_cities(
+            collection=city_collection, user=user, limit=USER_EXPAND_MAX_CITIES
+        )
+        # Rendered here so the union response model can't fall back to ViewUser
+        return Response(render_json(ExpandedUser, user), media_type="application/json")
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND, detail=f"User '{username}' was not found"
     )
@@ -119,6 +186,11 @@ async def udate_user_profile(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
         )
-    return await update_user_and_return(
-        collection=collection, user=user, document=document
-    )
+    try:
+        return await update_user_and_return(
+            collection=collection, user=user, document=document
+        )
+    except CityListLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
@@ -0,0 +1,19 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float): ...
+
+    @abstractmethod
+    async def delete(self, *keys: str): ...
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
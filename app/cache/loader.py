@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from .base import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class CachedLoader:
+    def __init__(
+        self,
+        namespace: str,
+        backend: CacheBackend,
+        ttl: float,
+        publish: Callable[[str, tuple[str, ...]], Awaitable] | None = None,
+    ):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.publish = publish
+        self.hits = 0
+        self.misses = 0
+        self._pending: dict[str, asyncio.Task] = {}
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable]) -> Any:
+        if (value := await self._get(key)) is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        # Concurrent misses for the same key share one in-flight load
+        if (task := self._pending.get(key)) is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable]) -> Any:
+        try:
+            value = await loader()
+        finally:
+            is_current = self._pending.get(key) is asyncio.current_task()
+            if is_current:
+                del self._pending[key]
+        # A key invalidated while loading must not be repopulated with stale data
+        if is_current and value is not None:
+            try:
+                await self.backend.set(key, value, self.ttl)
+            except Exception as e:
+                logger.warning(
+                    "Cache %s failed to store %s: %s", self.namespace, key, e
+                )
+        return value
+
+    async def _get(self, key: str) -> Any | None:
+        # An unavailable backend degrades to uncached reads instead of failing them
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Cache %s failed to read %s: %s", self.namespace, key, e)
+            return None
+
+    async def peek(self, key: str) -> Any | None:
+        return await self._get(key)
+
+    async def invalidate_local(self, *keys: str):
+        for key in keys:
+            self._pending.pop(key, None)
+        # Writers call this after their write has landed, so a dead backend
+        # must not turn a stored write into an error; the TTL bounds staleness
+        try:
+            await self.backend.delete(*keys)
+        except Exception as e:
+            logger.warning(
+                "Cache %s failed to invalidate %s: %s", self.namespace, keys, e
+            )
+
+    async def invalidate(self, *keys: str):
+        await self.invalidate_local(*keys)
+        if self.publish is not None:
+            await self.publish(self.namespace, keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return self.backend.stats() | {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable
+
+from ..core.config import CACHE_BACKEND, CACHE_REDIS_URL, CACHE_INVALIDATION_CHANNEL
+from .base import CacheBackend
+from .loader import CachedLoader
+from .memory import MemoryCache
+from .redis import RedisCache, RedisConnection, RedisSubscriber
+
+logger = logging.getLogger(__name__)
+
+
+class CacheManager:
+    def __init__(self, backend: str, redis_url: str | None, channel: str):
+        if backend not in ("memory", "redis"):
+            raise ValueError(f"Unknown cache backend '{backend}'")
+        if backend == "redis" and not redis_url:
+            raise ValueError("Redis cache backend requires CACHE_REDIS_URL")
+        self.backend = backend
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.loaders: dict[str, CachedLoader] = {}
+        self.handlers: dict[str, Callable[[list[str]], Awaitable]] = {}
+        self.redis = RedisConnection(redis_url) if redis_url else None
+        self.subscriber = (
+            RedisSubscriber(redis_url, channel, self.on_message) if redis_url else None
+        )
+        self._subscriber_task: asyncio.Task | None = None
+
+    def create_backend(self, namespace: str, maxsize: int) -> CacheBackend:
+        if self.backend == "redis":
+            return RedisCache(self.redis, prefix=f"{namespace}:")
+        return MemoryCache(maxsize=maxsize)
+
+    def loader(self, namespace: str, maxsize: int, ttl: float) -> CachedLoader:
+        self.loaders[namespace] = CachedLoader(
+            namespace,
+            self.create_backend(namespace, maxsize),
+            ttl=ttl,
+            publish=self.publish,
+        )
+        loader = self.loaders[namespace]
+        self.subscribe(namespace, lambda keys: loader.invalidate_local(*keys))
+        return loader
+
+    def subscribe(self, namespace: str, handler: Callable[[list[str]], Awaitable]):
+        self.handlers[namespace] = handler
+
+    async def publish(self, namespace: str, keys: tuple[str, ...]):
+        if self.redis is None or not keys:
+            return
+        message = {"origin": self.origin, "namespace": namespace, "keys": list(keys)}
+        try:
+            await self.redis.execute("PUBLISH", self.channel, json.dumps(message))
+        except (ConnectionError, OSError) as e:
+            logger.warning("Failed to broadcast cache invalidation: %s", e)
+
+    async def on_message(self, data: bytes):
+        try:
+            message = json.loads(data)
+            origin, namespace, keys = (
+                message["origin"],
+                message["namespace"],
+                message["keys"],
+            )
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed cache invalidation message: %r", data)
+            return
+        if origin != self.origin and (handler := self.handlers.get(namespace)):
+            await handler(keys)
+
+    async def start(self):
+        if self.subscriber is not None and self._subscriber_task is None:
+            self._subscriber_task = asyncio.create_task(self.subscriber.run())
+
+    async def stop(self):
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            self._subscriber_task = None
+        if self.redis is not None:
+            await self.redis.close()
+
+    def stats(self) -> dict:
+        return {namespace: loader.stats() for namespace, loader in self.loaders.items()}
+
+
+cache_manager = CacheManager(
+    backend=CACHE_BACKEND,
+    redis_url=CACHE_REDIS_URL,
+    channel=CACHE_INVALIDATION_CHANNEL,
+)
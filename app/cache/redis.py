@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlparse
+
+import bson
+
+from .base import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by Redis server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        size = int(payload)
+        if size == -1:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(payload)
+        if size == -1:
+            return None
+        return [await read_reply(reader) for _ in range(size)]
+    raise RedisError(f"Unexpected reply type {kind!r}")
+
+
+class RedisConnection:
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+
+    async def open_stream(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        for command in (("AUTH", self.password), ("SELECT", self.db)):
+            if command[1]:
+                writer.write(encode_command(*command))
+                if isinstance(reply := await read_reply(reader), RedisError):
+                    writer.close()
+                    raise reply
+        return reader, writer
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            self._reader, self._writer = await self.open_stream()
+            self._reader_task = asyncio.create_task(self._read_replies())
+
+    async def _read_replies(self):
+        # Commands are pipelined on one connection; replies arrive in order
+        try:
+            while True:
+                reply = await read_reply(self._reader)
+                waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                if isinstance(reply, RedisError):
+                    waiter.set_exception(reply)
+                else:
+                    waiter.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            self._reset(e)
+
+    def _reset(self, exc: Exception):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = self._reader_task = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(ConnectionError(str(exc)))
+
+    async def execute(self, *args) -> Any:
+        if self._writer is None:
+            await self.connect()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._writer.write(encode_command(*args))
+        return await waiter
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        self._reset(ConnectionError("Connection closed"))
+
+
+class RedisSubscriber:
+    def __init__(
+        self,
+        url: str,
+        channel: str,
+        callback: Callable[[bytes], Awaitable | None],
+        retry_delay: float = 1,
+    ):
+        self.connection = RedisConnection(url)
+        self.channel = channel
+        self.callback = callback
+        self.retry_delay = retry_delay
+        self.subscribed = asyncio.Event()
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await self.connection.open_stream()
+                writer.write(encode_command("SUBSCRIBE", self.channel))
+                await read_reply(reader)
+                self.subscribed.set()
+                try:
+                    while True:
+                        reply = await read_reply(reader)
+                        if isinstance(reply, list) and reply[0] == b"message":
+                            if asyncio.iscoroutine(result := self.callback(reply[2])):
+                                await result
+                finally:
+                    self.subscribed.clear()
+                    writer.close()
+            except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+                logger.warning("Redis subscription to %s lost: %s", self.channel, e)
+                await asyncio.sleep(self.retry_delay)
+            except Exception:
+                # Anything else would end the task and stop invalidation for good
+                logger.exception("Redis subscription to %s failed", self.channel)
+                await asyncio.sleep(self.retry_delay)
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, connection: RedisConnection, prefix: str = ""):
+        self.connection = connection
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        if data := await self.connection.execute("GET", self.prefix + key):
+            return bson.decode(data)["value"]
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        data = bson.encode({"value": value})
+        await self.connection.execute(
+            "SET", self.prefix + key, data, "PX", max(int(ttl * 1000), 1)
+        )
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.connection.execute("DEL", *(self.prefix + key for key in keys))
@@ -0,0 +1,205 @@
+import zlib
+from functools import partial
+from typing import Awaitable, Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..cache.loader import CachedLoader
+from .etag import encoded_etag, request_etags
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    # Ties keep the earlier, better-compressing encoding
+    for coding in supported_encodings():
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(
+                gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    compressor = Compressor(encoding, gzip_level, brotli_quality)
+    return compressor.compress(body) + compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        responder = CompressionResponder(self, encoding, if_none_match, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        if_none_match: str,
+        send: Send,
+    ):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.if_none_match = if_none_match
+        self.downstream = send
+        self.start: Message | None = None
+        self.compressor: Compressor | None = None
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+        if self.start is not None:
+            await self.begin(message)
+            return
+        if self.compressor is not None:
+            body = self.compressor.compress(message.get("body", b""))
+            if not message.get("more_body", False):
+                body += self.compressor.finish()
+            message["body"] = body
+        await self.downstream(message)
+
+    async def begin(self, message: Message):
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if start["status"] == 304:
+            self.revalidated(headers)
+            await self.downstream(start)
+            await self.downstream(message)
+            return
+        if (
+            "content-encoding" in headers
+            or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            or (not more_body and len(body) < self.middleware.minimum_size)
+        ):
+            await self.downstream(start)
+            await self.downstream(message)
+            return
+        self.compressor = Compressor(
+            self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+        )
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if etag := headers.get("etag"):
+            headers["ETag"] = encoded_etag(etag, self.encoding)
+        body = self.compressor.compress(body)
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            body += self.compressor.finish()
+            headers["Content-Length"] = str(len(body))
+        message["body"] = body
+        await self.downstream(start)
+        await self.downstream(message)
+
+    def revalidated(self, headers: MutableHeaders):
+        # A 304 for a compressed representation repeats the tag the client holds
+        etag = headers.get("etag")
+        if etag and "content-encoding" not in headers:
+            encoded = encoded_etag(etag, self.encoding)
+            if encoded in request_etags(self.if_none_match):
+                headers["ETag"] = encoded
+                headers.add_vary_header("Accept-Encoding")
+
+
+class PrecompressedCache:
+    # Rendered bodies are cached once per encoding, so hits skip both
+    # serialization and compression
+    def __init__(
+        self,
+        loader: CachedLoader,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ):
+        self.loader = loader
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def get_or_render(
+        self,
+        key: str,
+        encoding: str | None,
+        render: Callable[[], Awaitable[tuple[bytes, dict]]],
+    ) -> tuple[bytes, dict, str | None]:
+        entry = await self.loader.get_or_load(key, partial(self._render, render))
+        if encoding is None or len(entry["body"]) < self.minimum_size:
+            return entry["body"], entry["headers"], None
+        compressed = await self.loader.get_or_load(
+            f"{key}:{encoding}", partial(self._compress, entry["body"], encoding)
+        )
+        return compressed["body"], entry["headers"], encoding
+
+    async def _render(self, render: Callable) -> dict:
+        body, headers = await render()
+        return {"body": body, "headers": headers}
+
+    async def _compress(self, body: bytes, encoding: str) -> dict:
+        return {"body": compress(body, encoding, self.gzip_level, self.brotli_quality)}
@@ -6,6 +6,15 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 # JWT settings
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+
+# Access token mode: "lookup" loads the user per request, "claims" signs the
+# active/staff flags into the token and only checks a cached token version
+ACCESS_TOKEN_MODE = os.getenv("ACCESS_TOKEN_MODE", "lookup")
+
+# Password hashing pool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", 32))
 
 # Database settings
 DATABASE_URL = os.getenv("DB_URL", "")
@@ -23,8 +32,71 @@ if not DATABASE_URL:
 
 DATABASE_NAME = os.getenv("MONGO_DB")
 
+# Connection pool and read routing settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = (
+    int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS"))
+    if os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    else None
+)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS")
+MONGO_READ_CONCERN = os.getenv("MONGO_READ_CONCERN")
+MONGO_POOL_WARMUP = int(os.getenv("MONGO_POOL_WARMUP", 10))
+# Read preference for read-only endpoints; writes always go to the primary
+READ_PREFERENCE = os.getenv("READ_PREFERENCE", "primary")
+READ_MAX_STALENESS_SECONDS = int(os.getenv("READ_MAX_STALENESS_SECONDS", -1))
+
 CITY_COLLECTION = "city"
 CITY_TEST_COLLECTION = "test_city"
 
 USER_COLLECTION = "user"
 USER_TEST_COLLECTION = "test_user"
+
+SIGHT_COLLECTION = "sight"
+SIGHT_TEST_COLLECTION = "test_sight"
+
+# Sight storage layout: "embedded" in city documents or a separate "collection"
+SIGHT_STORAGE = os.getenv("SIGHT_STORAGE", "embedded")
+
+# Bulk import settings
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+
+# Export settings
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+CITY_BATCH_MAX_SLUGS = int(os.getenv("CITY_BATCH_MAX_SLUGS", 100))
+USER_EXPAND_MAX_CITIES = int(os.getenv("USER_EXPAND_MAX_CITIES", 100))
+USER_CITY_LIST_LIMIT = int(os.getenv("USER_CITY_LIST_LIMIT", 500))
+
+# Slow query log: unset disables profiling of the CRUD functions
+SLOW_QUERY_MS = (
+    float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+)
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0.1))
+
+# Response mode: "validated" runs GET responses through their pydantic model,
+# "fast" projects trusted documents onto it and encodes them with orjson
+RESPONSE_MODE = os.getenv("RESPONSE_MODE", "validated")
+
+# Cache-Control sent with ETags; clients may store but must revalidate
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "no-cache")
+
+# Response compression settings
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+
+# Cache settings
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache-invalidate")
+CITY_CACHE_SIZE = int(os.getenv("CITY_CACHE_SIZE", 1024))
+CITY_CACHE_TTL = float(os.getenv("CITY_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 30))
+TOKEN_VERSION_CACHE_SIZE = int(os.getenv("TOKEN_VERSION_CACHE_SIZE", 16384))
+TOKEN_VERSION_CACHE_TTL = float(os.getenv("TOKEN_VERSION_CACHE_TTL", 30))
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", 60))
+TOP_PAGE_CACHE_SIZE = int(os.getenv("TOP_PAGE_CACHE_SIZE", 256))
+TOP_PAGE_CACHE_TTL = float(os.getenv("TOP_PAGE_CACHE_TTL", 300))
@@ -0,0 +1,55 @@
+import hashlib
+
+from bson import ObjectId
+from fastapi import Request, Response, status
+
+from .config import HTTP_CACHE_CONTROL
+
+
+def version_etag(city_id: ObjectId, version: int) -> str:
+    # The id keeps a re-created city with a reused slug from matching old tags
+    return f'"{city_id}-{version}"'
+
+
+def page_etag(versions: list[tuple[ObjectId, int]]) -> str:
+    digest = hashlib.sha1(
+        ",".join(f"{city_id}-{version}" for city_id, version in versions).encode()
+    )
+    return f'"{digest.hexdigest()}"'
+
+
+CONTENT_CODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    # Each content coding is its own representation and needs its own strong tag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def decoded_etag(etag: str) -> str:
+    for encoding in CONTENT_CODINGS:
+        if etag.endswith(suffix := f'-{encoding}"'):
+            return etag.removesuffix(suffix) + '"'
+    return etag
+
+
+def request_etags(header: str) -> list[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if not (header := request.headers.get("if-none-match")):
+        return False
+    tags = [decoded_etag(tag) for tag in request_etags(header)]
+    return "*" in tags or etag in tags
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = HTTP_CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,25 @@
+import base64
+import binascii
+
+from bson import json_util
+from bson.errors import InvalidId
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    raw = json_util.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor '{cursor}'") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+    return values
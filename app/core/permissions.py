@@ -0,0 +1,11 @@
+from fastapi import Depends, HTTPException, status
+
+from ..db.dependencies import get_current_active_user
+
+
+async def is_staff(current_user: dict = Depends(get_current_active_user)) -> dict:
+    if current_user.get("staff"):
+        return current_user
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+    )
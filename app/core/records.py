@@ -0,0 +1,78 @@
+import csv
+import json
+import zlib
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+
+class RecordError(ValueError):
+    pass
+
+
+def parse_ndjson_line(line: bytes | str) -> dict | RecordError:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return RecordError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        return RecordError("Record must be a JSON object")
+    return record
+
+
+async def iter_ndjson(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[dict | RecordError]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield parse_ndjson_line(line)
+    if buffer.strip():
+        yield parse_ndjson_line(buffer)
+
+
+async def iter_json_lines(lines: Iterable[str]) -> AsyncIterator[dict | RecordError]:
+    for line in lines:
+        if line.strip():
+            yield parse_ndjson_line(line)
+
+
+async def iter_csv(lines: Iterable[str]) -> AsyncIterator[dict]:
+    for row in csv.DictReader(lines):
+        yield {key: val for key, val in row.items() if val not in ("", None)}
+
+
+async def iter_list(records: list) -> AsyncIterator[dict | RecordError]:
+    for record in records:
+        yield (
+            record
+            if isinstance(record, dict)
+            else RecordError("Record must be a JSON object")
+        )
+
+
+async def encode_ndjson(
+    documents: AsyncIterable[dict],
+    fields: Iterable[str],
+    lines_per_chunk: int,
+    gzip: bool = False,
+) -> AsyncIterator[bytes]:
+    fields = set(fields)
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if gzip else None
+    lines = []
+
+    def flush() -> bytes:
+        chunk = "".join(lines).encode()
+        lines.clear()
+        return compressor.compress(chunk) if compressor else chunk
+
+    async for document in documents:
+        record = {key: val for key, val in document.items() if key in fields}
+        lines.append(json.dumps(record, default=str) + "\n")
+        if len(lines) >= lines_per_chunk and (chunk := flush()):
+            yield chunk
+    if lines and (chunk := flush()):
+        yield chunk
+    if compressor:
+        yield compressor.flush()
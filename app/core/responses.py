@@ -0,0 +1,124 @@
+import functools
+import typing
+from typing import Any, Callable
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, parse_obj_as
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+from starlette.responses import Response
+
+from ..metrics.middleware import TimedRoute
+from .config import RESPONSE_MODE
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=json_default)
+
+
+def model_dumper(model: type[BaseModel], exclude_unset: bool) -> Callable[[dict], dict]:
+    plan = []
+    for name, field in model.__fields__.items():
+        nested = None
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            if field.shape not in (SHAPE_LIST, SHAPE_SINGLETON):
+                raise TypeError(f"Unsupported shape of {model.__name__}.{name}")
+            nested = model_dumper(field.type_, exclude_unset)
+            if field.shape == SHAPE_LIST:
+                nested = functools.partial(list_dumper, nested)
+        plan.append((name, field.alias, field.get_default(), nested))
+
+    def dump(document: dict) -> dict:
+        result = {}
+        for name, alias, default, nested in plan:
+            if alias in document:
+                value = document[alias]
+            elif name in document:
+                value = document[name]
+            elif exclude_unset:
+                continue
+            else:
+                value = default
+            if nested is not None and value is not None:
+                value = nested(value)
+            result[alias] = value
+        return result
+
+    return dump
+
+
+def list_dumper(dump: Callable[[dict], dict], documents: list[dict]) -> list[dict]:
+    return [dump(document) for document in documents]
+
+
+def response_dumper(annotation: Any, exclude_unset: bool) -> Callable | None:
+    if typing.get_origin(annotation) is list:
+        if dump := response_dumper(typing.get_args(annotation)[0], exclude_unset):
+            return functools.partial(list_dumper, dump)
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return model_dumper(annotation, exclude_unset)
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def cached_response_dumper(annotation: Any, exclude_unset: bool) -> Callable | None:
+    return response_dumper(annotation, exclude_unset)
+
+
+def render_json(annotation: Any, content: Any, exclude_unset: bool = False) -> bytes:
+    # Same bytes the route would send, for handlers that cache rendered bodies
+    if RESPONSE_MODE == "fast":
+        dump = cached_response_dumper(annotation, exclude_unset)
+        return FastJSONResponse(dump(content)).body
+    value = parse_obj_as(annotation, content)
+    return JSONResponse(jsonable_encoder(value, exclude_unset=exclude_unset)).body
+
+
+class TrustedResponseRoute(TimedRoute):
+    # Documents read back from our own collections were validated on the way in,
+    # so GET responses are projected onto the response model without re-validation
+    def wrap_endpoint(self, endpoint: Callable) -> Callable:
+        endpoint = super().wrap_endpoint(endpoint)
+        if RESPONSE_MODE != "fast" or self.methods != {"GET"}:
+            return endpoint
+        dump = response_dumper(self.response_model, self.response_model_exclude_unset)
+        if dump is None:
+            return endpoint
+        return trusted_endpoint(
+            endpoint, dump, self.dependant.response_param_name, self.status_code
+        )
+
+
+def trusted_endpoint(
+    endpoint: Callable,
+    dump: Callable,
+    response_param_name: str | None,
+    status_code: int | None,
+) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        content = await endpoint(*args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        response = FastJSONResponse(
+            dump(content) if content is not None else None,
+            status_code=status_code or 200,
+        )
+        if (sub_response := kwargs.get(response_param_name)) is not None:
+            if sub_response.status_code:
+                response.status_code = sub_response.status_code
+            response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    wrapper.timed = True
+    return wrapper
@@ -1,12 +1,29 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable
+
 from motor.motor_asyncio import AsyncIOMotorCollection
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from ..crud.user import get_user_by_username
+from .config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ACCESS_TOKEN_MODE,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_DEPTH,
+)
+from ..crud.user import (
+    get_principal_by_username,
+    get_token_version,
+    get_user_by_username,
+)
 
 CREDENTIALS_EXCEPTION = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -14,32 +31,138 @@ CREDENTIALS_EXCEPTION = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
+HASHING_UNAVAILABLE_EXCEPTION = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Too many concurrent password operations, try again later",
+    headers={"Retry-After": "1"},
+)
+
 ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api1/users/token")
 
 
-def verify_password(password, hashed_password):
-    return ctx.verify(password, hashed_password)
+class HashingPool:
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self.inflight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    async def run(self, func: Callable, *args) -> Any:
+        # bcrypt releases the GIL, so threads give real parallelism here
+        if self.inflight >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise HASHING_UNAVAILABLE_EXCEPTION
+        self.inflight += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            return func(*args), started, time.perf_counter()
+
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(timed)
+        # A cancelled caller leaves the thread running, so the slot is only
+        # released once the hash itself is done
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+        result, started, finished = await asyncio.wrap_future(future)
+        self.completed += 1
+        self.queue_seconds += started - submitted
+        self.hash_seconds += finished - started
+        self.max_queue_seconds = max(self.max_queue_seconds, started - submitted)
+        return result
+
+    def release(self):
+        self.inflight -= 1
 
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
-def get_password_hash(password):
-    return ctx.hash(password)
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "inflight": self.inflight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_seconds_total": self.queue_seconds,
+            "queue_seconds_max": self.max_queue_seconds,
+            "hash_seconds_total": self.hash_seconds,
+        }
 
 
-def create_access_token(data: dict):
-    expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+hashing_pool = HashingPool(
+    workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE_DEPTH
+)
+
+
+async def verify_password(password, hashed_password):
+    return await hashing_pool.run(ctx.verify, password, hashed_password)
+
+
+async def get_password_hash(password):
+    return await hashing_pool.run(ctx.hash, password)
+
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    expires_delta = expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     additional = data.copy()
     expire = datetime.utcnow() + expires_delta
     additional["exp"] = expire
     return jwt.encode(additional, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_user_access_token(user: dict) -> str:
+    data = {"sub": user["username"], "ver": user.get("token_version", 0)}
+    if ACCESS_TOKEN_MODE == "claims":
+        data |= {"active": user["active"], "staff": user["staff"]}
+    return create_access_token(data=data)
+
+
+def create_refresh_token(user: dict) -> str:
+    return create_access_token(
+        data={
+            "sub": user["username"],
+            "type": "refresh",
+            "ver": user.get("token_version", 0),
+        },
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+
+
+async def authenticate_refresh_token(collection: AsyncIOMotorCollection, token: str):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise CREDENTIALS_EXCEPTION from e
+    if payload.get("type") != "refresh" or not payload.get("sub"):
+        raise CREDENTIALS_EXCEPTION
+    # The cached principal carries token_version, so no password is re-verified
+    user = await get_principal_by_username(
+        collection=collection, username=payload["sub"]
+    )
+    if (
+        user is None
+        or not user["active"]
+        or user.get("token_version", 0) != payload.get("ver")
+    ):
+        raise CREDENTIALS_EXCEPTION
+    return user
+
+
 async def authenticate_user(
     collection: AsyncIOMotorCollection, username: str, password: str
 ):
     user = await get_user_by_username(collection=collection, username=username)
-    if user and user["active"] and verify_password(password, user["password"]):
+    if user and user["active"] and await verify_password(password, user["password"]):
         return user
 
 
@@ -47,11 +170,26 @@ async def get_current_user(collection: AsyncIOMotorCollection, token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
-        if not username:
+        if not username or payload.get("type") == "refresh":
             raise CREDENTIALS_EXCEPTION
     except JWTError as e:
         raise CREDENTIALS_EXCEPTION from e
-    user = await get_user_by_username(collection=collection, username=username)
-    if user is None:
+    if ACCESS_TOKEN_MODE == "claims" and "active" in payload:
+        return await get_claims_principal(collection, payload)
+    user = await get_principal_by_username(collection=collection, username=username)
+    # Tokens issued before versioning carry no "ver" and count as version 0
+    if user is None or user.get("token_version", 0) != payload.get("ver", 0):
         raise CREDENTIALS_EXCEPTION
     return user
+
+
+async def get_claims_principal(collection: AsyncIOMotorCollection, payload: dict):
+    # Only the token version is looked up, so revocation costs one cached read
+    version = await get_token_version(collection=collection, username=payload["sub"])
+    if version is None or version != payload["ver"]:
+        raise CREDENTIALS_EXCEPTION
+    return {
+        "username": payload["sub"],
+        "active": payload.get("active", False),
+        "staff": payload.get("staff", False),
+    }
@@ -0,0 +1,244 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel, ValidationError
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from slugify import slugify
+
+from ..core.config import SIGHT_STORAGE
+from ..core.records import RecordError
+from ..db.base import get_sight_collection
+from ..models.bulk import BulkError, BulkReport
+from ..models.city import ViewCity
+from ..models.sight import ViewSight
+from .city import (
+    invalidate_city_cache,
+    pop_city_sights,
+    replace_city_sights,
+    touch_cities,
+)
+from .leaderboard import update_leaderboard
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+    )
+
+
+async def validate_records(
+    records: AsyncIterable[dict | RecordError],
+    model: type[BaseModel],
+    report: BulkReport,
+) -> AsyncIterator[tuple[int, dict, dict]]:
+    row = 0
+    async for record in records:
+        row += 1
+        if isinstance(record, RecordError):
+            report.errors.append(BulkError(row=row, detail=str(record)))
+            continue
+        try:
+            document = model(**record).dict()
+        except ValidationError as e:
+            report.errors.append(BulkError(row=row, detail=validation_detail(e)))
+            continue
+        document["slug"] = slugify(document["name"])
+        yield row, document, record
+
+
+async def batched(items: AsyncIterator, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_errors(exc: BulkWriteError) -> dict[int, dict]:
+    return {error["index"]: error for error in exc.details["writeErrors"]}
+
+
+async def import_cities(
+    collection: AsyncIOMotorCollection,
+    records: AsyncIterable[dict | RecordError],
+    batch_size: int,
+) -> BulkReport:
+    report = BulkReport()
+    async for batch in batched(validate_records(records, ViewCity, report), batch_size):
+        await write_cities(collection, batch, report)
+    report.errors.sort(key=lambda error: error.row)
+    return report
+
+
+async def write_cities(
+    collection: AsyncIOMotorCollection, batch: list, report: BulkReport
+):
+    sights = {}
+    for _, city, _ in batch:
+        city["_id"] = ObjectId()
+        city["version"] = 1
+        sights[city["_id"]] = pop_city_sights(city)
+    failed = {}
+    try:
+        await collection.bulk_write(
+            [InsertOne(city) for _, city, _ in batch], ordered=False
+        )
+    except BulkWriteError as e:
+        failed = write_errors(e)
+    inserted = []
+    for index, (row, city, _) in enumerate(batch):
+        if error := failed.get(index):
+            detail = error["errmsg"]
+            if error["code"] == DUPLICATE_KEY_ERROR:
+                detail = f"City '{city['name']}' already exists"
+            report.errors.append(BulkError(row=row, detail=detail))
+        else:
+            inserted.append(city)
+    report.inserted += len(inserted)
+    await asyncio.gather(
+        *(
+            replace_city_sights(collection, city["slug"], sights[city["_id"]])
+            for city in inserted
+            if sights[city["_id"]]
+        )
+    )
+    if inserted:
+        await invalidate_city_cache(collection, *(city["slug"] for city in inserted))
+        await update_leaderboard(
+            collection, {city["_id"]: city["rating"] for city in inserted}
+        )
+
+
+async def import_sights(
+    collection: AsyncIOMotorCollection,
+    records: AsyncIterable[dict | RecordError],
+    batch_size: int,
+) -> BulkReport:
+    report = BulkReport()
+    async for batch in batched(
+        validate_records(records, ViewSight, report), batch_size
+    ):
+        await write_sights(collection, batch, report)
+    report.errors.sort(key=lambda error: error.row)
+    return report
+
+
+async def write_sights(
+    collection: AsyncIOMotorCollection, batch: list, report: BulkReport
+):
+    city_slugs = {slugify(str(record.get("city", ""))) for _, _, record in batch}
+    projection = {"slug": 1} if SIGHT_STORAGE == "collection" else {"sights.slug": 1}
+    cities = {
+        city["slug"]: {sight["slug"] for sight in city.get("sights", [])}
+        async for city in collection.find(
+            {"slug": {"$in": list(city_slugs)}}, projection | {"slug": 1}
+        )
+    }
+    accepted = []
+    for row, sight, record in batch:
+        city_slug = slugify(str(record.get("city", "")))
+        if city_slug not in cities:
+            detail = f"City '{record.get('city', '')}' was not found"
+        elif sight["slug"] in cities[city_slug]:
+            detail = f"Sight '{sight['name']}' already exists"
+        else:
+            cities[city_slug].add(sight["slug"])
+            accepted.append((row, sight, city_slug))
+            continue
+        report.errors.append(BulkError(row=row, detail=detail))
+    if not accepted:
+        return
+    if SIGHT_STORAGE == "collection":
+        await write_sight_documents(collection, accepted, report)
+        return
+    grouped: dict[str, list[tuple[int, dict]]] = {}
+    for row, sight, city_slug in accepted:
+        grouped.setdefault(city_slug, []).append((row, sight))
+    inserted = await asyncio.gather(
+        *(
+            push_sights(collection, city_slug, sights, report)
+            for city_slug, sights in grouped.items()
+        )
+    )
+    report.inserted += sum(inserted)
+    await invalidate_city_cache(collection, *grouped)
+
+
+def push_sights_update(sights: list[dict]) -> dict:
+    return {
+        "$push": {
+            "sights": {
+                "$each": sights,
+                "$sort": {"rating": -1, "number_of_scores": -1},
+            }
+        },
+        "$inc": {"version": 1},
+    }
+
+
+async def push_sights(
+    collection: AsyncIOMotorCollection,
+    city_slug: str,
+    sights: list[tuple[int, dict]],
+    report: BulkReport,
+) -> int:
+    # One re-sort per city instead of one per pushed sight
+    result = await collection.update_one(
+        {"slug": city_slug, "sights.slug": {"$nin": [s["slug"] for _, s in sights]}},
+        push_sights_update([sight for _, sight in sights]),
+    )
+    if result.matched_count:
+        return len(sights)
+    # A concurrent write added one of the slugs or removed the city since the
+    # batch was checked, so find out which rows still apply one by one
+    inserted = 0
+    for row, sight in sights:
+        result = await collection.update_one(
+            {"slug": city_slug, "sights.slug": {"$ne": sight["slug"]}},
+            push_sights_update([sight]),
+        )
+        if result.matched_count:
+            inserted += 1
+        elif await collection.count_documents({"slug": city_slug}, limit=1):
+            detail = f"Sight '{sight['name']}' already exists"
+            report.errors.append(BulkError(row=row, detail=detail))
+        else:
+            detail = f"City '{city_slug}' was not found"
+            report.errors.append(BulkError(row=row, detail=detail))
+    return inserted
+
+
+async def write_sight_documents(
+    collection: AsyncIOMotorCollection, accepted: list, report: BulkReport
+):
+    failed = {}
+    try:
+        await get_sight_collection(collection).bulk_write(
+            [
+                InsertOne(sight | {"city_slug": city_slug})
+                for _, sight, city_slug in accepted
+            ],
+            ordered=False,
+        )
+    except BulkWriteError as e:
+        failed = write_errors(e)
+    touched = set()
+    for index, (row, sight, city_slug) in enumerate(accepted):
+        if error := failed.get(index):
+            detail = error["errmsg"]
+            if error["code"] == DUPLICATE_KEY_ERROR:
+                detail = f"Sight '{sight['name']}' already exists"
+            report.errors.append(BulkError(row=row, detail=detail))
+        else:
+            touched.add(city_slug)
+    report.inserted += len(accepted) - len(failed)
+    if touched:
+        await touch_cities(collection, *touched)
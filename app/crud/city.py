@@ -1,45 +1,196 @@
+import re
+from functools import partial
+from typing import AsyncIterator
+
 import pymongo
+from bson import ObjectId
 from slugify import slugify
 
 from motor.motor_asyncio import AsyncIOMotorCollection
-from ..models.city import ViewCity, UpdateCity
+from ..cache.manager import cache_manager
+from ..core.config import CITY_CACHE_SIZE, CITY_CACHE_TTL, SIGHT_STORAGE
+from ..core.pagination import InvalidCursor, encode_cursor, decode_cursor
+from ..db.base import get_sight_collection, with_primary
+from ..metrics.profiler import profiled
+from ..models.city import CITY_SUMMARY_FIELDS, ViewCity, UpdateCity
+from .leaderboard import get_leaderboard, update_leaderboard
+
+RATING_PAGE_ATTEMPTS = 3
+
+city_cache = cache_manager.loader("city", maxsize=CITY_CACHE_SIZE, ttl=CITY_CACHE_TTL)
+
+
+def city_cache_key(collection: AsyncIOMotorCollection, slug: str) -> str:
+    return f"{collection.name}:{slug}"
+
+
+async def invalidate_city_cache(collection: AsyncIOMotorCollection, *slugs: str):
+    await city_cache.invalidate(*(city_cache_key(collection, slug) for slug in slugs))
+
 
+def city_summary_projection(fields: list[str] | None = None) -> dict:
+    return {field: 1 for field in fields or CITY_SUMMARY_FIELDS}
 
+
+def city_list_cursor(city: dict) -> str:
+    return encode_cursor(city["_id"])
+
+
+def decode_list_cursor(cursor: str) -> ObjectId:
+    (last_id,) = decode_cursor(cursor, 1)
+    if not isinstance(last_id, ObjectId):
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+    return last_id
+
+
+def city_rating_cursor(collection: AsyncIOMotorCollection, city: dict) -> str:
+    # The leaderboard key is what the next page is sought by
+    key = get_leaderboard(collection).key(city["_id"])
+    return encode_cursor(*(key or (city.get("rating") or 0, city["_id"])))
+
+
+def build_city_query(
+    search: str | None, prefix: str | None, projection: dict | None
+) -> tuple[dict, dict | None, list]:
+    query, sort = {}, [("_id", pymongo.ASCENDING)]
+    if search:
+        query["$text"] = {"$search": search}
+        projection = (projection or {}) | {"score": {"$meta": "textScore"}}
+        sort = [("score", {"$meta": "textScore"}), ("_id", pymongo.ASCENDING)]
+    elif prefix:
+        query["slug"] = {"$regex": f"^{re.escape(slugify(prefix))}"}
+        sort = [("slug", pymongo.ASCENDING)]
+    return query, projection, sort
+
+
+@profiled
 async def get_all_cities(
     collection: AsyncIOMotorCollection,
     limit: int,
     skip: int,
     search: str | None,
+    cursor: str | None = None,
+    prefix: str | None = None,
+    projection: dict | None = None,
 ) -> list:
-    if search:
-        return await collection.find(
-            {
-                "$or": [
-                    {"name": {"$regex": search, "$options": "i"}},
-                    {"description": {"$regex": search, "$options": "i"}},
-                ]
-            },
-            skip=skip,
-        ).to_list(length=limit)
-    return await collection.find(skip=skip).to_list(length=limit)
+    query, projection, sort = build_city_query(search, prefix, projection)
+    if cursor:
+        if search or prefix:
+            raise InvalidCursor("Cursor is not supported for search queries")
+        query["_id"] = {"$gt": decode_list_cursor(cursor)}
+        skip = 0
+    return (
+        await collection.find(query, projection)
+        .sort(sort)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=limit)
+    )
 
 
+async def iter_all_cities(
+    collection: AsyncIOMotorCollection,
+    batch_size: int,
+    search: str | None = None,
+    prefix: str | None = None,
+    projection: dict | None = None,
+) -> AsyncIterator[dict]:
+    query, projection, sort = build_city_query(search, prefix, projection)
+    async for city in (
+        collection.find(query, projection).sort(sort).batch_size(batch_size)
+    ):
+        yield city
+
+
+@profiled
 async def get_city_by_slug(
     collection: AsyncIOMotorCollection, slug: str
 ) -> dict | None:
-    return await collection.find_one({"slug": slug})
+    return await city_cache.get_or_load(
+        city_cache_key(collection, slug),
+        partial(with_primary(collection).find_one, {"slug": slug}),
+    )
+
 
+@profiled
+async def get_cities_by_slugs(
+    collection: AsyncIOMotorCollection,
+    slugs: list[str],
+    projection: dict | None = None,
+) -> tuple[list[dict], list[str]]:
+    if projection:
+        projection = projection | {"slug": 1}
+    cities = {
+        city["slug"]: city
+        async for city in collection.find({"slug": {"$in": slugs}}, projection)
+    }
+    return (
+        [cities[slug] for slug in slugs if slug in cities],
+        [slug for slug in slugs if slug not in cities],
+    )
 
+
+@profiled
+async def get_city_version(
+    collection: AsyncIOMotorCollection, slug: str
+) -> tuple[ObjectId, int] | None:
+    # A cached city answers directly; otherwise slug_1_version_1__id_1 covers it
+    city = await city_cache.peek(city_cache_key(collection, slug))
+    if city is None:
+        city = await collection.find_one({"slug": slug}, {"_id": 1, "version": 1})
+    if city is not None:
+        return city["_id"], city.get("version", 0)
+
+
+async def touch_cities(collection: AsyncIOMotorCollection, *slugs: str):
+    await collection.update_many({"slug": {"$in": slugs}}, {"$inc": {"version": 1}})
+    await invalidate_city_cache(collection, *slugs)
+
+
+def pop_city_sights(city_doc: dict) -> list[dict] | None:
+    # In collection mode the detail view only shows the sight collection, so
+    # sights sent along with a city are moved there
+    if SIGHT_STORAGE != "collection" or "sights" not in city_doc:
+        return None
+    sights = {
+        slugify(sight["name"]): sight | {"slug": slugify(sight["name"])}
+        for sight in city_doc["sights"]
+    }
+    city_doc["sights"] = []
+    return list(sights.values())
+
+
+async def replace_city_sights(
+    collection: AsyncIOMotorCollection, city_slug: str, sights: list[dict]
+):
+    sight_collection = get_sight_collection(collection)
+    await sight_collection.delete_many({"city_slug": city_slug})
+    if sights:
+        await sight_collection.insert_many(
+            [sight | {"city_slug": city_slug} for sight in sights]
+        )
+
+
+@profiled
 async def insert_city_and_return(
     collection: AsyncIOMotorCollection, document: ViewCity
 ) -> dict:
     city_doc = document.dict()
     city_doc["slug"] = slugify(city_doc["name"])
+    city_doc["version"] = 1
+    sights = pop_city_sights(city_doc)
     result = await collection.insert_one(city_doc)
+    if sights:
+        await replace_city_sights(collection, city_doc["slug"], sights)
+    await invalidate_city_cache(collection, city_doc["slug"])
+    await update_leaderboard(collection, {result.inserted_id: city_doc["rating"]})
     city_doc.update({"_id": result.inserted_id})
+    if sights is not None:
+        city_doc["sights"] = sights
     return city_doc
 
 
+@profiled
 async def update_city_and_return(
     collection: AsyncIOMotorCollection,
     slug: str,
@@ -48,23 +199,98 @@ async def update_city_and_return(
     city_doc = document.dict(exclude_unset=True)
     if "name" in city_doc:
         city_doc["slug"] = slugify(city_doc["name"])
-    return await collection.find_one_and_update(
-        {"slug": slug}, {"$set": city_doc}, return_document=pymongo.ReturnDocument.AFTER
+    sights = pop_city_sights(city_doc)
+    update = {"$inc": {"version": 1}}
+    if city_doc:
+        update["$set"] = city_doc
+    city = await collection.find_one_and_update(
+        {"slug": slug}, update, return_document=pymongo.ReturnDocument.AFTER
     )
+    await invalidate_city_cache(collection, slug, city_doc.get("slug", slug))
+    if city and SIGHT_STORAGE == "collection" and city["slug"] != slug:
+        await get_sight_collection(collection).update_many(
+            {"city_slug": slug}, {"$set": {"city_slug": city["slug"]}}
+        )
+    if city and sights is not None:
+        await replace_city_sights(collection, city["slug"], sights)
+        city["sights"] = sights
+    if city and "rating" in city_doc:
+        await update_leaderboard(collection, {city["_id"]: city["rating"]})
+    return city
 
 
+@profiled
 async def delete_city_and_return(
     collection: AsyncIOMotorCollection, slug: str
 ) -> dict | None:
-    return await collection.find_one_and_delete({"slug": slug})
+    city = await collection.find_one_and_delete({"slug": slug})
+    await invalidate_city_cache(collection, slug)
+    if city and SIGHT_STORAGE == "collection":
+        await get_sight_collection(collection).delete_many({"city_slug": slug})
+    if city:
+        await update_leaderboard(collection, {city["_id"]: None})
+    return city
+
+
+def decode_rating_cursor(cursor: str) -> tuple[float, ObjectId]:
+    rating, last_id = decode_cursor(cursor, 2)
+    if (
+        isinstance(rating, bool)
+        or not isinstance(rating, (int, float))
+        or not isinstance(last_id, ObjectId)
+    ):
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+    return rating, last_id
+
+
+async def get_rating_page(
+    collection: AsyncIOMotorCollection,
+    limit: int,
+    skip: int,
+    cursor: str | None,
+    projection: dict | None = None,
+) -> list[dict]:
+    after = decode_rating_cursor(cursor) if cursor else None
+    leaderboard = get_leaderboard(collection)
+    await leaderboard.ensure_ready()
+    for _ in range(RATING_PAGE_ATTEMPTS):
+        if not (ids := leaderboard.page(limit=limit, skip=skip, after=after)):
+            return []
+        cities = {
+            city["_id"]: city
+            async for city in collection.find({"_id": {"$in": ids}}, projection)
+        }
+        if len(cities) == len(ids):
+            break
+        # Cities deleted behind the leaderboard's back are dropped and the
+        # page is topped up from the next entries; ids the primary still has
+        # are only missing from a lagging secondary and stay ranked
+        missing = [city_id for city_id in ids if city_id not in cities]
+        for city_id in missing:
+            await leaderboard.refresh(city_id)
+        if all(leaderboard.key(city_id) for city_id in missing):
+            break
+    return [cities[city_id] for city_id in ids if city_id in cities]
+
+
+@profiled
+async def get_rating_page_versions(
+    collection: AsyncIOMotorCollection,
+    limit: int,
+    skip: int,
+    cursor: str | None = None,
+) -> list[tuple[ObjectId, int]]:
+    cities = await get_rating_page(collection, limit, skip, cursor, {"version": 1})
+    return [(city["_id"], city.get("version", 0)) for city in cities]
 
 
+@profiled
 async def get_cities_by_rating(
-    collection: AsyncIOMotorCollection, limit: int, skip: int
+    collection: AsyncIOMotorCollection,
+    limit: int,
+    skip: int,
+    cursor: str | None = None,
+    projection: dict | None = None,
 ) -> list[dict]:
-    return (
-        await collection.find()
-        .sort("rating", pymongo.DESCENDING)
-        .skip(skip)
-        .to_list(length=limit)
-    )
+    # The next cursor comes from the leaderboard, so only requested fields are read
+    return await get_rating_page(collection, limit, skip, cursor, projection)
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ..cache.manager import cache_manager
+from ..core.config import LEADERBOARD_TTL
+from ..db.base import with_primary
+
+
+class Leaderboard:
+    def __init__(
+        self, collection: AsyncIOMotorCollection, ttl: float = LEADERBOARD_TTL
+    ):
+        self.collection = collection
+        self.ttl = ttl
+        self.ready = False
+        self.revision = 0
+        self.built_at = 0.0
+        # Ascending (-rating, _id) keys give "rating desc, _id asc" order
+        self._keys: list[tuple[float, ObjectId]] = []
+        self._ratings: dict[ObjectId, float] = {}
+        self._dirty: set[ObjectId] | None = None
+        self._lock = asyncio.Lock()
+        self._rebuild_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def _rebuild(self) -> set[ObjectId]:
+        self._dirty = set()
+        self.built_at = time.monotonic()
+        ratings = {}
+        async for doc in self.collection.find({}, {"rating": 1}):
+            ratings[doc["_id"]] = doc.get("rating") or 0
+        self._ratings = ratings
+        self._keys = sorted((-rating, _id) for _id, rating in ratings.items())
+        dirty, self._dirty = self._dirty, None
+        self.ready = True
+        self.revision += 1
+        return dirty
+
+    async def rebuild(self, force: bool = True):
+        async with self._lock:
+            if self.ready and not force:
+                return
+            dirty = await self._rebuild()
+        # Writes that raced with the scan are re-read from the database
+        for city_id in dirty:
+            await self.refresh(city_id)
+
+    def is_stale(self) -> bool:
+        return bool(self.ttl) and time.monotonic() - self.built_at > self.ttl
+
+    async def ensure_ready(self):
+        if not self.ready:
+            await self.rebuild(force=False)
+        elif self.is_stale() and (
+            self._rebuild_task is None or self._rebuild_task.done()
+        ):
+            # Writes from other processes only reach us through Redis, if at
+            # all, so the order is rescanned periodically; the current one is
+            # served meanwhile
+            self._rebuild_task = asyncio.create_task(self.rebuild())
+
+    def upsert(self, city_id: ObjectId, rating: float | None):
+        if self._dirty is not None:
+            self._dirty.add(city_id)
+        self._discard(city_id)
+        rating = rating or 0
+        self._ratings[city_id] = rating
+        insort(self._keys, (-rating, city_id))
+        self.revision += 1
+
+    def remove(self, city_id: ObjectId):
+        if self._dirty is not None:
+            self._dirty.add(city_id)
+        if self._discard(city_id):
+            self.revision += 1
+
+    def _discard(self, city_id: ObjectId) -> bool:
+        if (rating := self._ratings.pop(city_id, None)) is None:
+            return False
+        position = bisect_left(self._keys, (-rating, city_id))
+        del self._keys[position]
+        return True
+
+    async def refresh(self, city_id: ObjectId):
+        if city := await self.collection.find_one({"_id": city_id}, {"rating": 1}):
+            self.upsert(city_id, city.get("rating"))
+        else:
+            self.remove(city_id)
+
+    def key(self, city_id: ObjectId) -> tuple[float, ObjectId] | None:
+        if (rating := self._ratings.get(city_id)) is None:
+            return None
+        return rating, city_id
+
+    def page(
+        self, limit: int, skip: int = 0, after: tuple[float, ObjectId] | None = None
+    ) -> list[ObjectId]:
+        start = skip
+        if after is not None:
+            rating, last_id = after
+            start = bisect_right(self._keys, (-rating, last_id))
+        return [city_id for _, city_id in self._keys[start : start + limit]]
+
+
+leaderboards: dict[str, Leaderboard] = {}
+
+
+def get_leaderboard(collection: AsyncIOMotorCollection) -> Leaderboard:
+    if collection.name not in leaderboards:
+        leaderboards[collection.name] = Leaderboard(with_primary(collection))
+    return leaderboards[collection.name]
+
+
+async def rebuild_leaderboard(collection: AsyncIOMotorCollection):
+    await get_leaderboard(collection).rebuild()
+
+
+async def update_leaderboard(
+    collection: AsyncIOMotorCollection, ratings: dict[ObjectId, float | None]
+):
+    leaderboard = get_leaderboard(collection)
+    for city_id, rating in ratings.items():
+        if rating is None:
+            leaderboard.remove(city_id)
+        else:
+            leaderboard.upsert(city_id, rating)
+    await cache_manager.publish(
+        "leaderboard", tuple(f"{collection.name}:{city_id}" for city_id in ratings)
+    )
+
+
+async def on_leaderboard_message(keys: list[str]):
+    for key in keys:
+        collection_name, city_id = key.rsplit(":", 1)
+        if leaderboard := leaderboards.get(collection_name):
+            if leaderboard.ready:
+                await leaderboard.refresh(ObjectId(city_id))
+
+
+cache_manager.subscribe("leaderboard", on_leaderboard_message)
@@ -1,25 +1,54 @@
 import pymongo
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 from slugify import slugify
 from pymongo.errors import DuplicateKeyError
 
+from ..core.config import SIGHT_STORAGE
+from ..metrics.profiler import profiled
 from ..models.sight import ViewSight, UpdateSight
-from .city import get_city_by_slug
+from . import sight_collection
+from .city import get_city_by_slug, invalidate_city_cache
 
 
+@profiled
 async def get_sights_by_city_slug(
     collection: AsyncIOMotorCollection, slug: str, limit: int, skip: int
-) -> list[dict] | None:
-    city = await get_city_by_slug(collection, slug)
-    return city["sights"][skip : skip + limit]
+) -> tuple[list[dict], int, tuple[ObjectId, int]] | None:
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.get_sights_by_city_slug(
+            collection, slug, limit, skip
+        )
+    pipeline = [
+        {"$match": {"slug": slug}},
+        {
+            "$project": {
+                "sights": {"$slice": [{"$ifNull": ["$sights", []]}, skip, limit]},
+                "total": {"$size": {"$ifNull": ["$sights", []]}},
+                "version": {"$ifNull": ["$version", 0]},
+            }
+        },
+    ]
+    async for city in collection.aggregate(pipeline):
+        return city["sights"], city["total"], (city["_id"], city["version"])
 
 
+@profiled
+async def get_city_with_sights(collection: AsyncIOMotorCollection, city: dict) -> dict:
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.get_city_with_sights(collection, city)
+    return city
+
+
+@profiled
 async def insert_sight_and_return(
     collection: AsyncIOMotorCollection, slug: str, document: ViewSight
-) -> dict:
+) -> dict | None:
     sight = document.dict()
     sight_slug = slugify(sight["name"])
     sight["slug"] = sight_slug
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.insert_sight_and_return(collection, slug, sight)
     result = await collection.update_one(
         {"slug": slug, "sights.slug": {"$ne": sight_slug}},
         {
@@ -28,23 +57,33 @@ async def insert_sight_and_return(
                     "$each": [sight],
                     "$sort": {"rating": -1, "number_of_scores": -1},
                 }
-            }
+            },
+            "$inc": {"version": 1},
         },
     )
     if result.matched_count:
+        await invalidate_city_cache(collection, slug)
         return sight
+    if not await get_city_by_slug(collection, slug):
+        return None
     raise DuplicateKeyError("Match with existed slug field")
 
 
+@profiled
 async def get_sight_and_return(
     collection: AsyncIOMotorCollection, city_slug: str, sight_slug: str
 ) -> dict | None:
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.get_sight_and_return(
+            collection, city_slug, sight_slug
+        )
     if sight_doc := await collection.find_one(
         {"slug": city_slug, "sights.slug": sight_slug}, {"_id": 0, "sights.$": 1}
     ):
         return sight_doc["sights"][0]
 
 
+@profiled
 async def update_sight_and_return(
     collection: AsyncIOMotorCollection,
     city_slug: str,
@@ -54,30 +93,43 @@ async def update_sight_and_return(
     sight_doc = document.dict(exclude_unset=True)
     if "name" in sight_doc:
         sight_doc["slug"] = slugify(sight_doc["name"])
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.update_sight_and_return(
+            collection, city_slug, sight_slug, sight_doc
+        )
+    if "name" in sight_doc:
         if await get_sight_and_return(collection, city_slug, sight_slug):
             raise DuplicateKeyError("Match with existed slug field")
 
     sight = await collection.find_one_and_update(
         {"slug": city_slug, "sights.slug": sight_slug},
-        {"$set": {f"sights.$.{key}": val for key, val in sight_doc.items()}},
+        {
+            "$set": {f"sights.$.{key}": val for key, val in sight_doc.items()},
+            "$inc": {"version": 1},
+        },
         projection={"_id": 0, "sights.$": 1},
     )
     if sight:
+        await invalidate_city_cache(collection, city_slug)
         sight = sight["sights"][0]
         sight.update(**sight_doc)
         return sight
 
 
+@profiled
 async def delete_sight_and_return(
     collection: AsyncIOMotorCollection, city_slug: str, sight_slug: str
 ) -> dict | None:
-
+    if SIGHT_STORAGE == "collection":
+        return await sight_collection.delete_sight_and_return(
+            collection, city_slug, sight_slug
+        )
     if result := await collection.find_one_and_update(
         {"slug": city_slug},
-        {"$pull": {"sights": {"slug": sight_slug}}},
+        {"$pull": {"sights": {"slug": sight_slug}}, "$inc": {"version": 1}},
         return_document=pymongo.ReturnDocument.BEFORE,
     ):
+        await invalidate_city_cache(collection, city_slug)
         for sight in result["sights"]:
-            print(sight["slug"], sight)
             if sight["slug"] == sight_slug:
                 return sight
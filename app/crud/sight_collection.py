@@ -0,0 +1,90 @@
+import asyncio
+
+import pymongo
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ..db.base import get_sight_collection
+from .city import get_city_by_slug, touch_cities
+
+SIGHT_PROJECTION = {"_id": 0, "city_slug": 0}
+SIGHT_SORT = [("rating", pymongo.DESCENDING), ("number_of_scores", pymongo.DESCENDING)]
+
+
+async def get_sights_by_city_slug(
+    collection: AsyncIOMotorCollection, slug: str, limit: int, skip: int
+) -> tuple[list[dict], int, tuple[ObjectId, int]] | None:
+    # The version is read with the page's routing and before it, so a lagging
+    # node can't label an old page with a newer version from the cache
+    city = await collection.find_one({"slug": slug}, {"version": 1})
+    if city is None:
+        return None
+    sights = get_sight_collection(collection)
+    page, total = await asyncio.gather(
+        sights.find({"city_slug": slug}, SIGHT_PROJECTION)
+        .sort(SIGHT_SORT)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=limit),
+        sights.count_documents({"city_slug": slug}),
+    )
+    return page, total, (city["_id"], city.get("version", 0))
+
+
+async def get_city_with_sights(collection: AsyncIOMotorCollection, city: dict) -> dict:
+    # Migrated cities no longer embed their sights, so the detail view joins them
+    sights = (
+        await get_sight_collection(collection)
+        .find({"city_slug": city["slug"]}, SIGHT_PROJECTION)
+        .sort(SIGHT_SORT)
+        .to_list(length=None)
+    )
+    return city | {"sights": sights}
+
+
+async def insert_sight_and_return(
+    collection: AsyncIOMotorCollection, slug: str, sight: dict
+) -> dict | None:
+    if not await get_city_by_slug(collection, slug):
+        return None
+    await get_sight_collection(collection).insert_one(sight | {"city_slug": slug})
+    await touch_cities(collection, slug)
+    return sight
+
+
+async def get_sight_and_return(
+    collection: AsyncIOMotorCollection, city_slug: str, sight_slug: str
+) -> dict | None:
+    return await get_sight_collection(collection).find_one(
+        {"city_slug": city_slug, "slug": sight_slug}, SIGHT_PROJECTION
+    )
+
+
+async def update_sight_and_return(
+    collection: AsyncIOMotorCollection,
+    city_slug: str,
+    sight_slug: str,
+    sight_doc: dict,
+) -> dict | None:
+    if not sight_doc:
+        return await get_sight_and_return(collection, city_slug, sight_slug)
+    sight = await get_sight_collection(collection).find_one_and_update(
+        {"city_slug": city_slug, "slug": sight_slug},
+        {"$set": sight_doc},
+        projection=SIGHT_PROJECTION,
+        return_document=pymongo.ReturnDocument.AFTER,
+    )
+    if sight:
+        await touch_cities(collection, city_slug)
+    return sight
+
+
+async def delete_sight_and_return(
+    collection: AsyncIOMotorCollection, city_slug: str, sight_slug: str
+) -> dict | None:
+    sight = await get_sight_collection(collection).find_one_and_delete(
+        {"city_slug": city_slug, "slug": sight_slug}, projection=SIGHT_PROJECTION
+    )
+    if sight:
+        await touch_cities(collection, city_slug)
+    return sight
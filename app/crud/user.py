@@ -1,11 +1,78 @@
+from functools import partial
+
 import pymongo
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.models.city import UpdateCity
 
+from ..cache.manager import cache_manager
+from ..core.config import (
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+    USER_CITY_LIST_LIMIT,
+    TOKEN_VERSION_CACHE_SIZE,
+    TOKEN_VERSION_CACHE_TTL,
+)
+from ..db.base import with_primary
+from ..metrics.profiler import profiled
 from ..models.user import FullUser, UpdateUser, ViewUser
+from .city import city_summary_projection, get_cities_by_slugs
+
+principal_cache = cache_manager.loader(
+    "principal", maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL
+)
+token_version_cache = cache_manager.loader(
+    "token_version", maxsize=TOKEN_VERSION_CACHE_SIZE, ttl=TOKEN_VERSION_CACHE_TTL
+)
+
+USER_CITY_LISTS = ("visited_cities", "like_to_visit")
+
+
+class CityListLimitExceeded(ValueError):
+    pass
+
+
+def compact_city_list(slugs: list[str], limit: int) -> list[str]:
+    # Newer entries sit at the end, so they survive the cap
+    return list(dict.fromkeys(slugs))[-limit:] if limit else []
+
+
+def principal_cache_key(collection: AsyncIOMotorCollection, username: str) -> str:
+    return f"{collection.name}:{username}"
 
 
+async def invalidate_principal(collection: AsyncIOMotorCollection, username: str):
+    await principal_cache.invalidate(principal_cache_key(collection, username))
+
+
+@profiled
+async def get_token_version(
+    collection: AsyncIOMotorCollection, username: str
+) -> int | None:
+    user = await token_version_cache.get_or_load(
+        principal_cache_key(collection, username),
+        partial(
+            with_primary(collection).find_one,
+            {"username": username},
+            {"token_version": 1},
+        ),
+    )
+    if user is not None:
+        return user.get("token_version", 0)
+
+
+@profiled
+async def revoke_user_tokens(collection: AsyncIOMotorCollection, username: str) -> bool:
+    result = await collection.update_one(
+        {"username": username}, {"$inc": {"token_version": 1}}
+    )
+    key = principal_cache_key(collection, username)
+    await token_version_cache.invalidate(key)
+    await principal_cache.invalidate(key)
+    return bool(result.matched_count)
+
+
+@profiled
 async def get_user_by_username(
     collection: AsyncIOMotorCollection,
     username: str,
@@ -13,29 +80,121 @@ async def get_user_by_username(
     return await collection.find_one({"username": username})
 
 
+@profiled
+async def expand_user_cities(
+    collection: AsyncIOMotorCollection, user: dict, limit: int
+) -> dict:
+    visited, like_to_visit = user.get("visited_cities", []), user.get(
+        "like_to_visit", []
+    )
+    slugs = list(dict.fromkeys(visited + like_to_visit))
+    cities, _ = await get_cities_by_slugs(
+        collection=collection,
+        slugs=slugs[:limit],
+        projection=city_summary_projection(),
+    )
+    cities = {city["slug"]: city for city in cities}
+    return user | {
+        "visited_cities": [cities[slug] for slug in visited if slug in cities],
+        "like_to_visit": [cities[slug] for slug in like_to_visit if slug in cities],
+        "unexpanded_cities": [slug for slug in slugs if slug not in cities],
+    }
+
+
+@profiled
+async def get_principal_by_username(
+    collection: AsyncIOMotorCollection, username: str
+) -> dict | None:
+    # Password hashes never enter the cache, which may be shared between workers
+    return await principal_cache.get_or_load(
+        principal_cache_key(collection, username),
+        partial(
+            with_primary(collection).find_one, {"username": username}, {"password": 0}
+        ),
+    )
+
+
+@profiled
 async def create_user(
     collection: AsyncIOMotorCollection, user: FullUser
 ) -> dict | None:
     return await collection.insert_one(user.dict())
 
 
+def without_slugs(array: dict | str, slugs: dict | str) -> dict:
+    return {
+        "$filter": {
+            "input": array,
+            "as": "slug",
+            "cond": {"$eq": [{"$in": ["$$slug", slugs]}, False]},
+        }
+    }
+
+
+def edited_city_list(field: str, added: list[str], removed: list[str]) -> dict:
+    # Kept entries stay in place and new ones are appended, as $pull and
+    # $addToSet would do, but within one pipeline update
+    kept = without_slugs({"$ifNull": [f"${field}", []]}, {"$literal": removed})
+    return {
+        "$let": {
+            "vars": {"kept": kept},
+            "in": {
+                "$concatArrays": [
+                    "$$kept",
+                    without_slugs({"$literal": added}, "$$kept"),
+                ]
+            },
+        }
+    }
+
+
+def city_list_guard(field: str, added: list[str], removed: list[str]) -> dict:
+    # Evaluated by the server against the stored list, so concurrent updates
+    # can't push it past the cap; lists already over it may only shrink
+    current = {"$ifNull": [f"${field}", []]}
+    kept = without_slugs(current, {"$literal": removed})
+    size = {"$size": {"$setUnion": [kept, {"$literal": added}]}}
+    return {
+        "$or": [
+            {"$lte": [size, USER_CITY_LIST_LIMIT]},
+            {"$lte": [size, {"$size": {"$setUnion": [current, []]}}]},
+        ]
+    }
+
+
+@profiled
 async def update_user_and_return(
     collection: AsyncIOMotorCollection, user: dict, document: UpdateUser
-) -> dict:
+) -> dict | None:
     username = user["username"]
-    update_user = document.dict()
-    update_email = update_user.get("email", user["email"])
-    visited_list = update_user["visited_cities"]
-    like_to_visit_list = update_user["like_to_visit"]
-    print(visited_list, like_to_visit_list, update_email, username)
-    return await collection.find_one_and_update(
-        {"username": username},
-        {
-            "$push": {
-                "visited_cities": {"$each": visited_list},
-                "like_to_visit": {"$each": like_to_visit_list},
-            },
-        },
-        {"$set": {"email": update_email}},
-        return_document=pymongo.ReturnDocument.AFTER,
+    update_user = document.dict(exclude_unset=True)
+    update, guards = {}, {}
+    for field in USER_CITY_LISTS:
+        removed = list(dict.fromkeys(update_user.get(f"remove_{field}", ())))
+        added = [
+            slug
+            for slug in dict.fromkeys(update_user.get(field, ()))
+            if slug not in removed
+        ]
+        if added:
+            guards[field] = city_list_guard(field, added, removed)
+        if added or removed:
+            update[field] = edited_city_list(field, added, removed)
+    if "email" in update_user:
+        update["email"] = {"$literal": update_user["email"]}
+    if not update:
+        return user
+    query = {"username": username}
+    if guards:
+        query["$expr"] = {"$and": list(guards.values())}
+    # One pipeline update, so the edit applies or fails as a whole
+    user = await collection.find_one_and_update(
+        query, [{"$set": update}], return_document=pymongo.ReturnDocument.AFTER
     )
+    await invalidate_principal(collection, username)
+    if guards and user is None:
+        raise CityListLimitExceeded(
+            f"At most {USER_CITY_LIST_LIMIT} cities in "
+            + ", ".join(f"'{field}'" for field in guards)
+        )
+    return user
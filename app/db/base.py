@@ -1,5 +1,23 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+import asyncio
+import logging
 
+import pymongo
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import (
+    Nearest,
+    PrimaryPreferred,
+    ReadPreference,
+    Secondary,
+    SecondaryPreferred,
+)
+
+from ..metrics.monitoring import command_timer
 from ..core.config import (
     DATABASE_URL,
     DATABASE_NAME,
@@ -7,27 +25,262 @@ from ..core.config import (
     CITY_TEST_COLLECTION,
     USER_COLLECTION,
     USER_TEST_COLLECTION,
+    SIGHT_COLLECTION,
+    SIGHT_TEST_COLLECTION,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_READ_CONCERN,
+    MONGO_POOL_WARMUP,
+    READ_PREFERENCE,
+    READ_MAX_STALENESS_SECONDS,
 )
 
+logger = logging.getLogger(__name__)
 
 city_collections = [CITY_COLLECTION, CITY_TEST_COLLECTION]
 user_collections = [USER_COLLECTION, USER_TEST_COLLECTION]
-unique_indexes = {
-    "slug": city_collections,
-    "username": user_collections,
+sight_collections = [SIGHT_COLLECTION, SIGHT_TEST_COLLECTION]
+city_sight_collections = dict(zip(city_collections, sight_collections))
+
+# Declarative index registry; names double as identity when diffing live indexes
+city_indexes = [
+    IndexModel("slug", name="slug_1", unique=True),
+    IndexModel(
+        [
+            ("slug", pymongo.ASCENDING),
+            ("version", pymongo.ASCENDING),
+            ("_id", pymongo.ASCENDING),
+        ],
+        name="slug_1_version_1__id_1",
+    ),
+    IndexModel(
+        [("name", pymongo.TEXT), ("description", pymongo.TEXT)],
+        name="city_text",
+        weights={"name": 10, "description": 1},
+    ),
+    IndexModel(
+        [("rating", pymongo.DESCENDING), ("_id", pymongo.ASCENDING)],
+        name="rating_-1__id_1",
+    ),
+    IndexModel(
+        "sights.slug",
+        name="sights.slug_1",
+        partialFilterExpression={"sights.slug": {"$exists": True}},
+    ),
+]
+user_indexes = [
+    IndexModel("username", name="username_1", unique=True),
+]
+sight_indexes = [
+    IndexModel(
+        [("city_slug", pymongo.ASCENDING), ("slug", pymongo.ASCENDING)],
+        name="city_slug_1_slug_1",
+        unique=True,
+    ),
+    IndexModel(
+        [
+            ("city_slug", pymongo.ASCENDING),
+            ("rating", pymongo.DESCENDING),
+            ("number_of_scores", pymongo.DESCENDING),
+        ],
+        name="city_slug_1_rating_-1_number_of_scores_-1",
+    ),
+]
+index_registry: dict[str, list[IndexModel]] = (
+    dict.fromkeys(city_collections, city_indexes)
+    | dict.fromkeys(user_collections, user_indexes)
+    | dict.fromkeys(sight_collections, sight_indexes)
+)
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "weights")
+
+read_preference_modes = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
 }
 
 
+def create_read_preference(mode: str, max_staleness: int = -1):
+    if mode == "primary":
+        return ReadPreference.PRIMARY
+    if mode not in read_preference_modes:
+        raise ValueError(f"Unknown read preference '{mode}'")
+    return read_preference_modes[mode](max_staleness=max_staleness)
+
+
+read_preference = create_read_preference(READ_PREFERENCE, READ_MAX_STALENESS_SECONDS)
+
+
+def get_sight_collection(
+    city_collection: AsyncIOMotorCollection,
+) -> AsyncIOMotorCollection:
+    # Sights are read with the same routing as the city collection they belong to
+    return city_collection.database.get_collection(
+        city_sight_collections[city_collection.name],
+        read_preference=city_collection.read_preference,
+        read_concern=city_collection.read_concern,
+    )
+
+
+def with_read_preference(collection: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    if read_preference == ReadPreference.PRIMARY:
+        return collection
+    return collection.with_options(read_preference=read_preference)
+
+
+def with_primary(collection: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    # Shared caches are keyed without the read preference, so they are only
+    # ever filled from the primary; a lagging secondary could otherwise pin an
+    # old document for a whole TTL
+    if collection.read_preference == ReadPreference.PRIMARY:
+        return collection
+    return collection.with_options(read_preference=ReadPreference.PRIMARY)
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "compressors": MONGO_COMPRESSORS,
+        "readConcernLevel": MONGO_READ_CONCERN,
+    }
+    return {key: val for key, val in options.items() if val is not None}
+
+
+async def warm_pool(client: AsyncIOMotorClient, connections: int):
+    # Concurrent pings make the driver open that many sockets up front
+    connections = min(connections, MONGO_MAX_POOL_SIZE)
+    pings = [client.admin.command("ping") for _ in range(connections)]
+    if read_preference != ReadPreference.PRIMARY:
+        pings += [
+            client.admin.command("ping", read_preference=read_preference)
+            for _ in range(connections)
+        ]
+    await asyncio.gather(*pings)
+
+
+def same_index(declared: dict, live: dict) -> bool:
+    if "weights" not in declared and list(declared["key"].items()) != [
+        tuple(key) for key in live["key"]
+    ]:
+        return False
+    return all(
+        (declared.get(option) or None) == (live.get(option) or None)
+        for option in COMPARED_OPTIONS
+    )
+
+
+async def diff_indexes(connection: AsyncIOMotorDatabase) -> dict[str, dict]:
+    names = list(index_registry)
+    live_indexes = await asyncio.gather(
+        *(connection[name].index_information() for name in names)
+    )
+    drift = {}
+    for name, live in zip(names, live_indexes):
+        declared = {model.document["name"]: model for model in index_registry[name]}
+        drift[name] = {
+            "missing": [
+                model for index, model in declared.items() if index not in live
+            ],
+            "conflicting": [
+                index
+                for index, model in declared.items()
+                if index in live and not same_index(model.document, live[index])
+            ],
+            "extra": [
+                index for index in live if index != "_id_" and index not in declared
+            ],
+        }
+    return drift
+
+
+class IndexManager:
+    def __init__(self):
+        self.status: dict[str, dict[str, list[str]]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def sync(self, connection: AsyncIOMotorDatabase, background: bool = False):
+        drift = await diff_indexes(connection)
+        required, deferred = [], []
+        for name, report in drift.items():
+            self.status[name] = {
+                "missing": [model.document["name"] for model in report["missing"]],
+                "conflicting": report["conflicting"],
+                "extra": report["extra"],
+                "built": [],
+                "failed": [],
+            }
+            if report["conflicting"] or report["extra"]:
+                logger.warning(
+                    "index drift on '%s': conflicting=%s extra=%s",
+                    name,
+                    report["conflicting"],
+                    report["extra"],
+                )
+            unique = [
+                model for model in report["missing"] if model.document.get("unique")
+            ]
+            secondary = [model for model in report["missing"] if model not in unique]
+            if unique:
+                required.append(self.build(connection[name], unique))
+            if secondary:
+                deferred.append(self.build(connection[name], secondary))
+        # Uniqueness must hold before traffic is accepted; only indexes that
+        # speed up queries are left to finish in the background
+        await asyncio.gather(*required)
+        if not deferred:
+            return
+        if background:
+            self._task = asyncio.ensure_future(asyncio.gather(*deferred))
+        else:
+            await asyncio.gather(*deferred)
+
+    async def build(self, collection: AsyncIOMotorCollection, models: list[IndexModel]):
+        status = self.status[collection.name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+            except PyMongoError as e:
+                logger.error(
+                    "building index '%s' on '%s' failed: %s", name, collection.name, e
+                )
+                status["failed"].append(name)
+            else:
+                status["built"].append(name)
+            status["missing"].remove(name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "building": self._task is not None and not self._task.done(),
+            "collections": self.status,
+        }
+
+
+index_manager = IndexManager()
+
+
 async def create_indexes(connection: AsyncIOMotorDatabase):
-    for field, collections in unique_indexes.items():
-        for collection_name in collections:
-            collection = connection[collection_name]
-            if f"{field}_1" not in await collection.index_information():
-                await collection.create_index(field, unique=True)
+    await index_manager.sync(connection)
 
 
-async def create_connection() -> list[AsyncIOMotorClient, AsyncIOMotorDatabase]:
-    client = AsyncIOMotorClient(DATABASE_URL)
+async def create_connection(
+    background_indexes: bool = False, warm: bool = False
+) -> list[AsyncIOMotorClient, AsyncIOMotorDatabase]:
+    client = AsyncIOMotorClient(
+        DATABASE_URL, event_listeners=[command_timer], **client_options()
+    )
     conn = client[DATABASE_NAME]
-    await create_indexes(conn)
+    if warm:
+        await warm_pool(client, MONGO_POOL_WARMUP)
+    await index_manager.sync(conn, background=background_indexes)
     return client, conn
@@ -3,6 +3,7 @@ from fastapi import Depends, HTTPException, Request
 
 from ..core.security import get_current_user, oauth2_scheme
 from ..core.config import CITY_COLLECTION, USER_COLLECTION
+from .base import with_read_preference
 
 
 async def check_attributes(request: Request, attr: str):
@@ -22,6 +23,18 @@ async def get_mongodb_conn_for_user(request: Request) -> AsyncIOMotorCollection:
     return request.app.state.mongodb[USER_COLLECTION]
 
 
+async def get_read_conn_for_city(
+    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_city),
+) -> AsyncIOMotorCollection:
+    return with_read_preference(collection)
+
+
+async def get_read_conn_for_user(
+    collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_user),
+) -> AsyncIOMotorCollection:
+    return with_read_preference(collection)
+
+
 async def get_current_active_user(
     collection: AsyncIOMotorCollection = Depends(get_mongodb_conn_for_user),
     token: str = Depends(oauth2_scheme),
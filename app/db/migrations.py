@@ -0,0 +1,83 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+from ..crud.user import USER_CITY_LISTS, compact_city_list
+from .base import get_sight_collection
+
+
+async def migrate_embedded_sights(
+    city_collection: AsyncIOMotorCollection, batch_size: int = 1000
+) -> int:
+    # Sights are upserted before being pulled from their city, so an
+    # interrupted run can simply be started again
+    sight_collection = get_sight_collection(city_collection)
+    sight_ops, city_ops, migrated = [], [], 0
+
+    async def flush():
+        nonlocal sight_ops, city_ops, migrated
+        if sight_ops:
+            await sight_collection.bulk_write(sight_ops, ordered=False)
+            await city_collection.bulk_write(city_ops, ordered=False)
+            migrated += len(sight_ops)
+        sight_ops, city_ops = [], []
+
+    cities = city_collection.find(
+        {"sights.0": {"$exists": True}}, {"slug": 1, "sights": 1}
+    ).sort("_id", 1)
+    async for city in cities:
+        slugs = []
+        for sight in city["sights"]:
+            slugs.append(sight["slug"])
+            sight_ops.append(
+                UpdateOne(
+                    {"city_slug": city["slug"], "slug": sight["slug"]},
+                    {"$set": sight | {"city_slug": city["slug"]}},
+                    upsert=True,
+                )
+            )
+        city_ops.append(
+            UpdateOne(
+                {"_id": city["_id"]},
+                {
+                    "$pull": {"sights": {"slug": {"$in": slugs}}},
+                    "$inc": {"version": 1},
+                },
+            )
+        )
+        if len(sight_ops) >= batch_size:
+            await flush()
+    await flush()
+    return migrated
+
+
+async def compact_user_city_lists(
+    user_collection: AsyncIOMotorCollection, limit: int, batch_size: int = 1000
+) -> int:
+    # The filter pins the lists that were read, so a concurrent profile update
+    # wins and that user is left for the next run
+    ops, compacted = [], 0
+
+    async def flush():
+        nonlocal ops, compacted
+        if ops:
+            result = await user_collection.bulk_write(ops, ordered=False)
+            compacted += result.modified_count
+        ops = []
+
+    users = user_collection.find({}, {field: 1 for field in USER_CITY_LISTS}).sort(
+        "_id", 1
+    )
+    async for user in users:
+        lists = {field: user.get(field, []) for field in USER_CITY_LISTS}
+        changed = {
+            field: compact
+            for field, slugs in lists.items()
+            if (compact := compact_city_list(slugs, limit)) != slugs
+        }
+        if changed:
+            pinned = {field: lists[field] for field in changed}
+            ops.append(UpdateOne({"_id": user["_id"]} | pinned, {"$set": changed}))
+        if len(ops) >= batch_size:
+            await flush()
+    await flush()
+    return compacted
@@ -1,7 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from .db.base import create_connection
+from .cache.manager import cache_manager
+from .core.compression import CompressionMiddleware
+from .core.config import (
+    BROTLI_QUALITY,
+    CITY_COLLECTION,
+    COMPRESSION_MINIMUM_SIZE,
+    GZIP_LEVEL,
+)
+from .core.security import hashing_pool
+from .crud.leaderboard import rebuild_leaderboard
+from .db.base import create_connection, index_manager
+from .metrics.middleware import MetricsMiddleware
+from .metrics.registry import registry
 from .api.api_v1.api import router as router_v1
 
 app = FastAPI()
@@ -15,14 +28,44 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY,
+)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
 async def startup_db_client():
     state = app.state
-    state.mongodb_client, state.mongodb = await create_connection()
+    state.mongodb_client, state.mongodb = await create_connection(
+        background_indexes=True, warm=True
+    )
+    await cache_manager.start()
+    await rebuild_leaderboard(state.mongodb[CITY_COLLECTION])
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await index_manager.stop()
     app.state.mongodb_client.close()
+    await cache_manager.stop()
+    hashing_pool.shutdown()
+
+
+@app.get("/stats", include_in_schema=False)
+async def get_stats():
+    return {
+        "cache": cache_manager.stats(),
+        "password_hashing": hashing_pool.stats(),
+        "indexes": index_manager.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(
+        registry.exposition(), media_type="text/plain; version=0.0.4"
+    )
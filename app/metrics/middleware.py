@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import time
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .timing import RequestTiming, current_timing, record_request
+
+
+class TimedRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        endpoint = self.dependant.call
+        if endpoint is not None and not getattr(endpoint, "timed", False):
+            self.dependant.call = self.wrap_endpoint(endpoint)
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def timed_handler(request: Request) -> Response:
+            timing = current_timing.get()
+            if timing is not None:
+                timing.route = route
+            response = await handler(request)
+            if timing is not None:
+                timing.handler_finished = time.perf_counter()
+            return response
+
+        return timed_handler
+
+    def wrap_endpoint(self, endpoint: Callable) -> Callable:
+        return timed_endpoint(endpoint)
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    # Serialization time is measured from the moment the endpoint returns
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if (timing := current_timing.get()) is not None:
+                timing.endpoint_finished = time.perf_counter()
+
+    wrapper.timed = True
+    return wrapper
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timing.reset(token)
+            record_request(
+                timing, scope["method"], status, time.perf_counter() - started, size
+            )
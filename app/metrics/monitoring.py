@@ -0,0 +1,36 @@
+from pymongo import monitoring
+
+from .profiler import command_finished, command_started
+from .registry import registry
+from .timing import current_timing
+
+COMMAND_SECONDS = registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("command",)
+)
+COMMAND_FAILURES = registry.counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("command",)
+)
+
+
+class CommandTimer(monitoring.CommandListener):
+    # Motor runs pymongo in executor threads with the caller's context copied,
+    # so current_timing still points at the request that issued the command
+    def started(self, event: monitoring.CommandStartedEvent):
+        command_started(event.request_id, event.command_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self.record(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        COMMAND_FAILURES.inc(event.command_name)
+        self.record(event)
+
+    def record(self, event: monitoring.CommandSucceededEvent):
+        seconds = event.duration_micros / 1e6
+        command_finished(event.request_id, seconds)
+        COMMAND_SECONDS.observe(seconds, event.command_name)
+        if (timing := current_timing.get()) is not None:
+            timing.db_seconds += seconds
+
+
+command_timer = CommandTimer()
@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import logging
+import random
+from contextvars import ContextVar
+from typing import Callable
+
+from bson import json_util
+
+from ..core.config import SLOW_QUERY_EXPLAIN_RATE, SLOW_QUERY_MS
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = registry.counter(
+    "mongodb_slow_queries_total", "Commands slower than SLOW_QUERY_MS", ("function",)
+)
+EXPLAINABLE_COMMANDS = {
+    "aggregate",
+    "count",
+    "delete",
+    "distinct",
+    "find",
+    "findAndModify",
+    "update",
+}
+# Driver-added session and routing fields the explain command rejects
+IGNORED_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber"}
+
+
+class QueryProfile:
+    __slots__ = ("function", "pending", "slow")
+
+    def __init__(self, function: str):
+        self.function = function
+        self.pending: dict[int, dict] = {}
+        self.slow: list[tuple[dict, float]] = []
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def command_started(request_id: int, command_name: str, command: dict):
+    if (profile := current_profile.get()) is not None:
+        if command_name in EXPLAINABLE_COMMANDS:
+            profile.pending[request_id] = dict(command)
+
+
+def command_finished(request_id: int, seconds: float):
+    if (profile := current_profile.get()) is not None:
+        command = profile.pending.pop(request_id, None)
+        if command is not None and seconds * 1000 >= SLOW_QUERY_MS:
+            profile.slow.append((command, seconds))
+
+
+def query_shape(command: dict) -> dict:
+    name = next(iter(command))
+    if name == "find":
+        keys = ("filter", "projection", "sort")
+    elif name == "findAndModify":
+        keys = ("query", "fields", "sort", "update")
+    elif name == "aggregate":
+        keys = ("pipeline",)
+    elif name in ("update", "delete"):
+        keys = ("updates", "deletes")
+    else:
+        keys = ("query", "key")
+    return {"command": name, "collection": command[name]} | {
+        key: command[key] for key in keys if key in command
+    }
+
+
+async def explain(collection, command: dict) -> dict | None:
+    command = {key: val for key, val in command.items() if key not in IGNORED_FIELDS}
+    try:
+        result = await collection.database.command(
+            {"explain": command, "verbosity": "queryPlanner"}
+        )
+    except Exception as e:
+        logger.debug("explain failed: %s", e)
+        return None
+    planner = result.get("queryPlanner") or next(
+        (
+            stage["$cursor"]["queryPlanner"]
+            for stage in result.get("stages", [])
+            if "$cursor" in stage
+        ),
+        {},
+    )
+    return planner.get("winningPlan")
+
+
+async def report(profile: QueryProfile, collection):
+    for command, seconds in profile.slow:
+        SLOW_QUERIES.inc(profile.function)
+        plan = None
+        if collection is not None and random.random() < SLOW_QUERY_EXPLAIN_RATE:
+            plan = await explain(collection, command)
+        logger.warning(
+            "slow query in %s took %.1fms: %s plan=%s",
+            profile.function,
+            seconds * 1000,
+            json_util.dumps(query_shape(command)),
+            json_util.dumps(plan) if plan is not None else "not sampled",
+        )
+
+
+def profiled(func: Callable) -> Callable:
+    if SLOW_QUERY_MS is None or not asyncio.iscoroutinefunction(func):
+        return func
+    function = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Nested CRUD calls are attributed to the outermost profiled function
+        if current_profile.get() is not None:
+            return await func(*args, **kwargs)
+        profile = QueryProfile(function)
+        token = current_profile.set(profile)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_profile.reset(token)
+            if profile.slow:
+                collection = kwargs.get("collection", args[0] if args else None)
+                await report(profile, collection)
+
+    return wrapper
@@ -0,0 +1,56 @@
+from contextvars import ContextVar
+
+from .registry import SIZE_BUCKETS, registry
+
+ROUTE_LABELS = ("method", "route")
+
+REQUESTS = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route and status",
+    (*ROUTE_LABELS, "status"),
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Total request latency", ROUTE_LABELS
+)
+DB_SECONDS = registry.histogram(
+    "http_request_db_seconds",
+    "Time spent in MongoDB commands per request",
+    ROUTE_LABELS,
+)
+SERIALIZATION_SECONDS = registry.histogram(
+    "http_response_serialization_seconds",
+    "Time from endpoint return to rendered response",
+    ROUTE_LABELS,
+)
+RESPONSE_BYTES = registry.histogram(
+    "http_response_size_bytes", "Response body size", ROUTE_LABELS, SIZE_BUCKETS
+)
+
+
+class RequestTiming:
+    __slots__ = ("route", "db_seconds", "endpoint_finished", "handler_finished")
+
+    def __init__(self):
+        self.route = "unmatched"
+        self.db_seconds = 0.0
+        self.endpoint_finished: float | None = None
+        self.handler_finished: float | None = None
+
+
+current_timing: ContextVar[RequestTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+def record_request(
+    timing: RequestTiming, method: str, status: int, seconds: float, size: int
+):
+    labels = (method, timing.route)
+    REQUESTS.inc(*labels, str(status))
+    REQUEST_SECONDS.observe(seconds, *labels)
+    DB_SECONDS.observe(timing.db_seconds, *labels)
+    RESPONSE_BYTES.observe(size, *labels)
+    if timing.endpoint_finished is not None and timing.handler_finished is not None:
+        SERIALIZATION_SECONDS.observe(
+            timing.handler_finished - timing.endpoint_finished, *labels
+        )
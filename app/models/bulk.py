@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+
+BULK_REPORT_EXAMPLE = {
+    "inserted": 2,
+    "errors": [{"row": 3, "detail": "City 'Moscow' already exists"}],
+}
+
+
+class BulkErrorConfig:
+    schema_extra = {"example": BULK_REPORT_EXAMPLE["errors"][0]}
+
+
+class BulkReportConfig:
+    schema_extra = {"example": BULK_REPORT_EXAMPLE}
+
+
+class BulkError(BaseModel):
+    row: int
+    detail: str
+
+    class Config(BulkErrorConfig):
+        pass
+
+
+class BulkReport(BaseModel):
+    inserted: int = 0
+    errors: list[BulkError] = []
+
+    class Config(BulkReportConfig):
+        pass
@@ -21,12 +21,22 @@ CITY_EXAMPLE = {
     "reviews": [],
 }
 
+CITY_SUMMARY_EXAMPLE = {"slug": "moscow"} | {
+    key: val for key, val in CITY_EXAMPLE.items() if key not in ("sights", "reviews")
+}
+
 FULL_CITY_EXAMPLE = {
     "_id": "61f9a0a8485011106d5aa394",
     "slug": "moscow",
 } | CITY_EXAMPLE
 
 
+CITY_BATCH_EXAMPLE = {
+    "cities": [{"slug": "moscow", "name": "Moscow", "rating": 4.56}],
+    "missing": ["atlantis"],
+}
+
+
 class BaseCityConfig:
     schema_extra = {"example": CITY_EXAMPLE}
 
@@ -40,6 +50,14 @@ class FullCityConfig:
     schema_extra = {"example": FULL_CITY_EXAMPLE}
 
 
+class CitySummaryConfig:
+    schema_extra = {"example": CITY_SUMMARY_EXAMPLE}
+
+
+class CityBatchConfig:
+    schema_extra = {"example": CITY_BATCH_EXAMPLE}
+
+
 class BaseCity(BaseModel):
     name: str | None
     description: str | None
@@ -66,3 +84,29 @@ class FullCity(DBRequiredNameMixin, DBModelMixin, BaseCity):
 class UpdateCity(BaseCity):
     class Config(ViewCityConfig):
         pass
+
+
+class CitySummary(BaseModel):
+    slug: str | None
+    name: str | None
+    description: str | None
+    foundation_year: int | None
+    time_zone: int | None
+    square: float | None
+    climate: str | None
+    rating: float | None
+    number_of_scores: int | None
+
+    class Config(CitySummaryConfig):
+        pass
+
+
+CITY_SUMMARY_FIELDS = tuple(CitySummary.__fields__)
+
+
+class CityBatch(BaseModel):
+    cities: list[CitySummary] = []
+    missing: list[str] = []
+
+    class Config(CityBatchConfig):
+        pass
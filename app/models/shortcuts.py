@@ -17,6 +17,55 @@ ADDITIONAL_CONFLICT_CITY_SCHEMA = {
     }
 }
 
+ADDITIONAL_INVALID_FIELDS_SCHEMA = {
+    400: {
+        "description": "Unknown fields requested",
+        "content": {
+            "application/json": {"example": {"detail": "Unknown fields: sights"}}
+        },
+    }
+}
+
+ADDITIONAL_INVALID_BULK_BODY_SCHEMA = {
+    400: {
+        "description": "Malformed bulk body",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Expected a JSON array or NDJSON body"}
+            }
+        },
+    }
+}
+
+# Both errors answer 400, and OpenAPI keeps one entry per status code
+ADDITIONAL_INVALID_CURSOR_OR_FIELDS_SCHEMA = {
+    400: {
+        "description": "Invalid pagination cursor or unknown fields requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "cursor": {"value": {"detail": "Invalid cursor 'abc'"}},
+                    "fields": {"value": {"detail": "Unknown fields: sights"}},
+                }
+            }
+        },
+    }
+}
+
+ADDITIONAL_INVALID_BATCH_OR_FIELDS_SCHEMA = {
+    400: {
+        "description": "Too many slugs or unknown fields requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "batch": {"value": {"detail": "At most 100 slugs per batch"}},
+                    "fields": {"value": {"detail": "Unknown fields: sights"}},
+                }
+            }
+        },
+    }
+}
+
 # Sights additional schemas
 ADDITIONAL_NOT_FOUND_SIGHT_SCHEMA = {
     404: {
@@ -59,6 +108,17 @@ ADDITIONAL_UNAUTHORIZED_INCORRECT_SCHEMA = {
     }
 }
 
+ADDITIONAL_UNAUTHORIZED_CREDENTIALS_SCHEMA = {
+    401: {
+        "description": "Unauthorized",
+        "content": {
+            "application/json": {
+                "example": {"detail": "Could not validate credentials"}
+            }
+        },
+    }
+}
+
 ADDITIONAL_CONFLICT_USER_SCHEMA = {
     409: {
         "description": "User already exists",
@@ -87,6 +147,20 @@ ADDITIONAL_NOT_FOUND_USER_SCHEMA = {
 }
 
 
+ADDITIONAL_HASHING_UNAVAILABLE_SCHEMA = {
+    503: {
+        "description": "Password hashing pool is saturated",
+        "content": {
+            "application/json": {
+                "example": {
+                    "detail": "Too many concurrent password operations, try again later"
+                }
+            }
+        },
+    }
+}
+
+
 ADDITIONAL_PERMISSION_SCHEMA = {
     403: {
         "description": "Forbidden",
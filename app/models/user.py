@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, validator
 from .base import DBIdMixin, PasswordMixin
+from .city import CitySummary
 
 
 BASE_USER_EXAMPLE = {
@@ -19,12 +20,25 @@ UPDATE_USER_EXAMPLE = {
 
 VIEW_USER_EXAMPLE = BASE_USER_EXAMPLE | UPDATE_USER_EXAMPLE
 
+EDIT_USER_EXAMPLE = UPDATE_USER_EXAMPLE | {
+    "remove_visited_cities": [],
+    "remove_like_to_visit": [],
+}
+
+EXPANDED_USER_EXAMPLE = BASE_USER_EXAMPLE | {
+    "email": "ruslan@yandex.ru",
+    "visited_cities": [{"slug": "moscow", "name": "Moscow", "rating": 4.56}],
+    "like_to_visit": [],
+    "unexpanded_cities": ["atlantis"],
+}
+
 FULL_USER_EXAMPLE = (
     LOGIN_USER_EXAMPLE
     | UPDATE_USER_EXAMPLE
     | {
         "active": True,
         "staff": False,
+        "token_version": 0,
     }
 )
 
@@ -41,13 +55,17 @@ class RegisterUserConfig:
 
 
 class UpdateUserConfig:
-    schema_extra = {"example": UPDATE_USER_EXAMPLE}
+    schema_extra = {"example": EDIT_USER_EXAMPLE}
 
 
 class ViewUserConfig:
     schema_extra = {"example": VIEW_USER_EXAMPLE}
 
 
+class ExpandedUserConfig:
+    schema_extra = {"example": EXPANDED_USER_EXAMPLE}
+
+
 class FullUserConfig:
     schema_extra = {"example": FULL_USER_EXAMPLE}
 
@@ -85,23 +103,39 @@ class RegisterUser(PasswordMixin, BaseUser):
         pass
 
 
-class UpdateUser(BaseModel):
+class UserProfile(BaseModel):
     email: EmailStr = None
     visited_cities: list[str] = []
     like_to_visit: list[str] = []
 
+
+class UpdateUser(UserProfile):
+    remove_visited_cities: list[str] = []
+    remove_like_to_visit: list[str] = []
+
     class Config(UpdateUserConfig):
         pass
 
 
-class ViewUser(UpdateUser, BaseUser):
+class ViewUser(UserProfile, BaseUser):
     class Config(ViewUserConfig):
         pass
 
 
-class FullUser(UpdateUser, LoginUser):
+class ExpandedUser(BaseUser):
+    email: EmailStr = None
+    visited_cities: list[CitySummary] = []
+    like_to_visit: list[CitySummary] = []
+    unexpanded_cities: list[str] = []
+
+    class Config(ExpandedUserConfig):
+        pass
+
+
+class FullUser(UserProfile, LoginUser):
     active: bool = True
     staff: bool = False
+    token_version: int = 0
 
     class Config(FullUserConfig):
         pass
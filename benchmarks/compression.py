@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import time
+
+from app.core.compression import compress, supported_encodings
+
+from .run import PROFILES, SCENARIOS, asgi_client, profile_params, start_app, stop_app
+
+PAYLOADS = ("cities", "top", "city", "sights")
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 5, 11)}
+
+
+async def fetch_payloads(args: argparse.Namespace) -> dict[str, bytes]:
+    params = profile_params(args)
+    client = await start_app(args, params)
+    try:
+        async with asgi_client({"Accept-Encoding": "identity"}) as http:
+            payloads = {}
+            for name in PAYLOADS:
+                method, url, kwargs = SCENARIOS[name](0, params)
+                response = await http.request(method, url, **kwargs)
+                payloads[name] = response.content
+            return payloads
+    finally:
+        await stop_app(client)
+
+
+def measure(body: bytes, encoding: str, level: int, rounds: int) -> dict:
+    gzip_level, brotli_quality = (level, 0) if encoding == "gzip" else (0, level)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        compressed = compress(body, encoding, gzip_level, brotli_quality)
+    elapsed = (time.perf_counter() - started) / rounds
+    return {
+        "bytes": len(compressed),
+        "ratio": len(compressed) / len(body) if body else 1.0,
+        "ms": elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare response size against compression CPU per encoding"
+    )
+    parser.add_argument("--profile", choices=PROFILES, default="small")
+    parser.add_argument("--cities", type=int)
+    parser.add_argument("--sights", type=int, help="Sights on the heaviest city")
+    parser.add_argument("--users", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--mongo-url", help="Benchmark against a real mongod")
+    parser.add_argument("--database", default="countries_benchmark")
+    args = parser.parse_args()
+
+    payloads = asyncio.run(fetch_payloads(args))
+    for name, body in payloads.items():
+        print(f"{name:<8} identity {len(body):>9}B")
+        for encoding in supported_encodings():
+            for level in LEVELS[encoding]:
+                result = measure(body, encoding, level, args.rounds)
+                print(
+                    f"{'':<8} {encoding:<4} {level:>3} {result['bytes']:>9}B  "
+                    f"ratio {result['ratio']:6.3f}  {result['ms']:8.3f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
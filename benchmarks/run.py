@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.cache.manager import cache_manager
+from app.core.config import (
+    CITY_COLLECTION,
+    RESPONSE_MODE,
+    SECRET_KEY,
+    SIGHT_STORAGE,
+)
+from app.crud.leaderboard import leaderboards, rebuild_leaderboard
+from app.db.base import create_indexes
+from app.main import app
+from app.metrics.monitoring import command_timer
+
+from .seed import SIGHT_HEAVY_CITY, USER_PASSWORD, WORDS, seed_cities, seed_users
+
+PROFILES = {
+    "small": {"cities": 1000, "sights": 5000, "users": 1000},
+    "large": {"cities": 100000, "sights": 5000, "users": 100000},
+}
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def list_cities(i: int, params: dict) -> tuple[str, str, dict]:
+    return "GET", "/api1/cities/", {"params": {"limit": 20}}
+
+
+def top_cities(i: int, params: dict) -> tuple[str, str, dict]:
+    return "GET", "/api1/cities/top", {"params": {"limit": 20}}
+
+
+def search_cities(i: int, params: dict) -> tuple[str, str, dict]:
+    return "GET", "/api1/cities/", {"params": {"search": WORDS[i % len(WORDS)]}}
+
+
+def get_city(i: int, params: dict) -> tuple[str, str, dict]:
+    return "GET", f"/api1/cities/{SIGHT_HEAVY_CITY}", {}
+
+
+def list_sights(i: int, params: dict) -> tuple[str, str, dict]:
+    skip = i * 50 % max(params["sights"], 1)
+    url = f"/api1/cities/{SIGHT_HEAVY_CITY}/sights"
+    return "GET", url, {"params": {"limit": 50, "skip": skip}}
+
+
+def login(i: int, params: dict) -> tuple[str, str, dict]:
+    username = f"user{i % max(params['users'], 1)}"
+    form = {"username": username, "password": USER_PASSWORD}
+    return "POST", "/api1/users/token", {"data": form}
+
+
+SCENARIOS = {
+    "cities": list_cities,
+    "top": top_cities,
+    "search": search_cities,
+    "city": get_city,
+    "sights": list_sights,
+    "login": login,
+}
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario,
+    params: dict,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    for i in range(warmup):
+        method, url, kwargs = scenario(i, params)
+        await client.request(method, url, **kwargs)
+    latencies: list[float] = []
+    errors = 0
+    downloaded = 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal errors, downloaded
+        for i in indexes:
+            method, url, kwargs = scenario(i, params)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+            downloaded += response.num_bytes_downloaded
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_bytes": downloaded / requests if requests else 0,
+    }
+
+
+async def open_database(args: argparse.Namespace):
+    if args.mongo_url:
+        client = AsyncIOMotorClient(args.mongo_url, event_listeners=[command_timer])
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("Pass --mongo-url or install mongomock-motor")
+        client = AsyncMongoMockClient()
+    db = client[args.database]
+    await create_indexes(db)
+    return client, db
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def profile_params(args: argparse.Namespace) -> dict:
+    return PROFILES[args.profile] | {
+        key: getattr(args, key)
+        for key in ("cities", "sights", "users")
+        if getattr(args, key) is not None
+    }
+
+
+async def start_app(args: argparse.Namespace, params: dict):
+    client, db = await open_database(args)
+    print(f"seeding {params} into {backend_name(args)} ({args.database})")
+    await seed_cities(db, params["cities"], params["sights"])
+    await seed_users(db, params["users"])
+    app.state.mongodb_client, app.state.mongodb = client, db
+    leaderboards.clear()
+    await cache_manager.start()
+    await rebuild_leaderboard(db[CITY_COLLECTION])
+    return client
+
+
+async def stop_app(client):
+    await cache_manager.stop()
+    client.close()
+
+
+def asgi_client(headers: dict | None = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        headers=headers,
+    )
+
+
+def backend_name(args: argparse.Namespace) -> str:
+    return "mongod" if args.mongo_url else "mongomock"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    params = profile_params(args)
+    backend = backend_name(args)
+    scenarios = args.scenario or list(SCENARIOS)
+    if backend == "mongomock" and "search" in scenarios:
+        # mongomock has no $text support
+        print("skipping 'search': it needs a real mongod")
+        scenarios.remove("search")
+
+    client = await start_app(args, params)
+    results = {}
+    headers = {"Accept-Encoding": args.accept_encoding}
+    try:
+        async with asgi_client(headers) as http:
+            for name in scenarios:
+                requests = args.login_requests if name == "login" else args.requests
+                results[name] = await run_scenario(
+                    http,
+                    SCENARIOS[name],
+                    params,
+                    requests=requests,
+                    concurrency=args.concurrency,
+                    warmup=args.warmup,
+                )
+                print(format_result(name, results[name]))
+    finally:
+        await stop_app(client)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend": backend,
+        "sight_storage": SIGHT_STORAGE,
+        "response_mode": RESPONSE_MODE,
+        "profile": args.profile,
+        "params": params,
+        "concurrency": args.concurrency,
+        "accept_encoding": args.accept_encoding,
+        "results": results,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f"{name:<8} {result['throughput']:9.1f} req/s  "
+        f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+        f"p99 {result['p99_ms']:8.2f}ms  {result['mean_bytes']:9.0f}B  "
+        f"errors {result['errors']}"
+    )
+
+
+def compare(report: dict, baseline: dict):
+    print(f"compared with {baseline['commit']} ({baseline['timestamp']})")
+    for name, result in report["results"].items():
+        if (previous := baseline["results"].get(name)) is None:
+            continue
+        changes = []
+        for key in ("throughput", "p50_ms", "p95_ms", "p99_ms", "mean_bytes"):
+            if previous.get(key):
+                change = (result[key] - previous[key]) / previous[key] * 100
+                changes.append(f"{key} {change:+.1f}%")
+        print(f"{name:<8} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the API hot paths in-process through ASGI"
+    )
+    parser.add_argument("--profile", choices=PROFILES, default="small")
+    parser.add_argument("--cities", type=int)
+    parser.add_argument("--sights", type=int, help="Sights on the heaviest city")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--accept-encoding",
+        default="identity",
+        help="Accept-Encoding sent with every request, e.g. 'gzip' or 'br'",
+    )
+    parser.add_argument(
+        "--mongo-url", help="Seed and query a real mongod instead of mongomock"
+    )
+    parser.add_argument("--database", default="countries_benchmark")
+    parser.add_argument("--output", help="Defaults to benchmarks/results/")
+    parser.add_argument("--compare", help="Earlier result file to diff against")
+    args = parser.parse_args()
+    if not SECRET_KEY:
+        raise SystemExit("SECRET_KEY must be set, the login scenario signs tokens")
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"{report['timestamp'][:19].replace(':', '')}-{report['commit']}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import random
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from passlib.context import CryptContext
+
+from app.core.config import (
+    CITY_COLLECTION,
+    SIGHT_COLLECTION,
+    SIGHT_STORAGE,
+    USER_COLLECTION,
+)
+
+WORDS = (
+    "river",
+    "harbour",
+    "mountain",
+    "cathedral",
+    "market",
+    "university",
+    "fortress",
+    "museum",
+    "bridge",
+    "lake",
+)
+CLIMATES = ("continental", "oceanic", "subtropical", "arid", "subarctic")
+SIGHT_HEAVY_CITY = "city-0"
+USER_PASSWORD = "benchmark"
+
+
+def city_document(index: int, rng: random.Random) -> dict:
+    words = rng.sample(WORDS, 3)
+    return {
+        "name": f"City {index}",
+        "slug": f"city-{index}",
+        "description": f"A city with a {words[0]}, a {words[1]} and a {words[2]}.",
+        "foundation_year": rng.randint(800, 2000),
+        "time_zone": rng.randint(-11, 12),
+        "square": round(rng.uniform(10, 3000), 1),
+        "climate": rng.choice(CLIMATES),
+        "rating": round(rng.uniform(0, 5), 2),
+        "number_of_scores": rng.randint(0, 10000),
+        "sights": [],
+        "reviews": [],
+    }
+
+
+def sight_document(index: int, rng: random.Random) -> dict:
+    return {
+        "name": f"Sight {index}",
+        "slug": f"sight-{index}",
+        "description": f"A {rng.choice(WORDS)} worth a visit.",
+        "visited": rng.randint(0, 100000),
+        "rating": round(rng.uniform(0, 5), 2),
+        "number_of_scores": rng.randint(0, 5000),
+    }
+
+
+async def insert_in_batches(collection, documents, batch_size: int = 5000) -> int:
+    batch, inserted = [], 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+
+async def seed_cities(
+    db: AsyncIOMotorDatabase, cities: int, sights: int, seed: int = 0
+) -> int:
+    rng = random.Random(seed)
+    await db[CITY_COLLECTION].delete_many({})
+    await db[SIGHT_COLLECTION].delete_many({})
+    await insert_in_batches(
+        db[CITY_COLLECTION], (city_document(i, rng) for i in range(cities))
+    )
+    # One city carries every sight, the worst case for sight listing
+    documents = sorted(
+        (sight_document(i, rng) for i in range(sights)),
+        key=lambda sight: (sight["rating"], sight["number_of_scores"]),
+        reverse=True,
+    )
+    if SIGHT_STORAGE == "collection":
+        await insert_in_batches(
+            db[SIGHT_COLLECTION],
+            (sight | {"city_slug": SIGHT_HEAVY_CITY} for sight in documents),
+        )
+    else:
+        await db[CITY_COLLECTION].update_one(
+            {"slug": SIGHT_HEAVY_CITY}, {"$set": {"sights": documents}}
+        )
+    return cities
+
+
+async def seed_users(db: AsyncIOMotorDatabase, users: int) -> int:
+    # Hashing once keeps seeding fast; every login still pays a full verify
+    password = CryptContext(schemes=["bcrypt"]).hash(USER_PASSWORD)
+    await db[USER_COLLECTION].delete_many({})
+    return await insert_in_batches(
+        db[USER_COLLECTION],
+        (
+            {
+                "username": f"user{i}",
+                "password": password,
+                "email": None,
+                "visited_cities": [],
+                "like_to_visit": [],
+                "active": True,
+                "staff": False,
+                "token_version": 0,
+            }
+            for i in range(users)
+        ),
+    )
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+
+from app.core.config import (
+    BULK_BATCH_SIZE,
+    CITY_COLLECTION,
+    USER_CITY_LIST_LIMIT,
+    USER_COLLECTION,
+)
+from app.core.records import iter_csv, iter_json_lines
+from app.crud.bulk import import_cities, import_sights
+from app.crud.user import revoke_user_tokens
+from app.db.base import create_connection, index_manager
+from app.db.migrations import compact_user_city_lists, migrate_embedded_sights
+
+
+async def migrate_sights(args: argparse.Namespace):
+    client, conn = await create_connection()
+    try:
+        migrated = await migrate_embedded_sights(
+            conn[args.collection], batch_size=args.batch_size
+        )
+    finally:
+        client.close()
+    print(f"Migrated {migrated} sights from '{args.collection}'")
+
+
+async def compact_users(args: argparse.Namespace):
+    client, conn = await create_connection()
+    try:
+        compacted = await compact_user_city_lists(
+            conn[args.collection], limit=args.limit, batch_size=args.batch_size
+        )
+    finally:
+        client.close()
+    print(f"Compacted city lists of {compacted} users in '{args.collection}'")
+
+
+async def import_records(args: argparse.Namespace):
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    importer = import_cities if args.command == "import-cities" else import_sights
+    client, conn = await create_connection()
+    try:
+        with open(args.path, newline="", encoding="utf-8") as lines:
+            records = (
+                iter_csv(lines) if file_format == "csv" else iter_json_lines(lines)
+            )
+            report = await importer(
+                conn[args.collection], records, batch_size=args.batch_size
+            )
+    finally:
+        client.close()
+    for error in report.errors:
+        print(f"row {error.row}: {error.detail}")
+    print(f"Imported {report.inserted} records, {len(report.errors)} failed")
+
+
+async def revoke_tokens(args: argparse.Namespace):
+    client, conn = await create_connection()
+    try:
+        revoked = await revoke_user_tokens(conn[args.collection], args.username)
+    finally:
+        client.close()
+    if revoked:
+        print(f"Revoked access tokens of '{args.username}'")
+    else:
+        print(f"User '{args.username}' was not found")
+
+
+async def sync_indexes(args: argparse.Namespace):
+    client, _ = await create_connection()
+    client.close()
+    for name, status in index_manager.stats()["collections"].items():
+        print(
+            f"{name}: built={status['built']} failed={status['failed']} "
+            f"conflicting={status['conflicting']} extra={status['extra']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="countriesapp management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser(
+        "migrate-sights", help="Move embedded city sights to the sight collection"
+    )
+    migrate.add_argument("--collection", default=CITY_COLLECTION)
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.set_defaults(handler=migrate_sights)
+
+    compact = commands.add_parser(
+        "compact-users", help="Deduplicate and cap the city lists of every user"
+    )
+    compact.add_argument("--collection", default=USER_COLLECTION)
+    compact.add_argument("--limit", type=int, default=USER_CITY_LIST_LIMIT)
+    compact.add_argument("--batch-size", type=int, default=1000)
+    compact.set_defaults(handler=compact_users)
+
+    for command, help_text in (
+        ("import-cities", "Import cities from an NDJSON or CSV file"),
+        ("import-sights", "Import sights with a 'city' column from NDJSON or CSV"),
+    ):
+        importer = commands.add_parser(command, help=help_text)
+        importer.add_argument("path")
+        importer.add_argument("--format", choices=["ndjson", "csv"])
+        importer.add_argument("--collection", default=CITY_COLLECTION)
+        importer.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+        importer.set_defaults(handler=import_records)
+
+    indexes = commands.add_parser(
+        "sync-indexes", help="Build missing indexes and report drift from the registry"
+    )
+    indexes.set_defaults(handler=sync_indexes)
+
+    revoke = commands.add_parser(
+        "revoke-tokens", help="Invalidate every issued access token of a user"
+    )
+    revoke.add_argument("username")
+    revoke.add_argument("--collection", default=USER_COLLECTION)
+    revoke.set_defaults(handler=revoke_tokens)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
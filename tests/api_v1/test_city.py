@@ -41,6 +41,48 @@ def test_list_all_cities_with_query(client):
     assert response.json()[0]["name"] == "Moscow"
 
 
+def test_list_all_cities_with_fields(client):
+    response = client.get("/api1/cities/?fields=slug,rating")
+    assert response.status_code == 200
+    assert response.json()[0] == {"slug": "moscow", "rating": 4.56}
+
+
+def test_list_all_cities_with_unknown_fields(client):
+    response = client.get("/api1/cities/?fields=name,sights")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: sights"
+
+
+def test_list_all_cities_with_prefix(client):
+    response = client.get("/api1/cities/?prefix=Saint P")
+    assert response.status_code == 200
+    assert [city["name"] for city in response.json()] == ["Saint-Petersburg"]
+
+
+def test_list_all_cities_with_cursor(client):
+    response = client.get("/api1/cities/?limit=1")
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api1/cities/?limit=1&cursor={cursor}")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Saint-Petersburg"
+
+
+def test_list_all_cities_with_invalid_cursor(client):
+    response = client.get("/api1/cities/?cursor=abc")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor 'abc'"
+
+
+def test_export_cities(client):
+    response = client.get("/api1/cities/export?fields=slug")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.splitlines() == [
+        '{"slug": "moscow"}',
+        '{"slug": "saint-petersburg"}',
+    ]
+
+
 def test_add_city(client):
     response = client.post("/api1/cities/", json=test_city)
     data = ViewCity(**response.json())
@@ -74,6 +116,15 @@ def test_get_nonexistent_city(client):
     assert response.json()["detail"] == "City 'mmoscow' was not found"
 
 
+def test_get_city_not_modified(client):
+    etag = client.get(f"/api1/cities/{test_city_slug}").headers["ETag"]
+    response = client.get(
+        f"/api1/cities/{test_city_slug}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
 def test_update_city(client):
     response = client.put(f"/api1/cities/{test_city_slug}", json={"time_zone": 5})
     data = ViewCity(**response.json())
@@ -82,6 +133,16 @@ def test_update_city(client):
     assert data.time_zone == 5
 
 
+def test_update_city_changes_etag(client):
+    etag = client.get(f"/api1/cities/{test_city_slug}").headers["ETag"]
+    client.put(f"/api1/cities/{test_city_slug}", json={"climate": "arctic"})
+    response = client.get(
+        f"/api1/cities/{test_city_slug}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
 def test_update_nonexistent_city(client):
     response = client.put("/api1/cities/mmoscow", json={"time_zone": 5})
     assert response.status_code == 404
@@ -107,9 +168,60 @@ def test_delete_nonexistent_city(client):
     assert response.json()["detail"] == "City 'mmoscow' was not found"
 
 
+def test_add_cities_in_bulk(client):
+    body = "\n".join(
+        [
+            '{"name": "Tomsk", "description": "Siberian city"}',
+            '{"name": "Moscow", "description": "Capital"}',
+            '{"description": "No name"}',
+        ]
+    )
+    response = client.post(
+        "/api1/cities/bulk",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "inserted": 1,
+        "errors": [
+            {"row": 2, "detail": "City 'Moscow' already exists"},
+            {"row": 3, "detail": "name: field required"},
+        ],
+    }
+    assert client.delete(f"/api1/cities/{test_city_slug}").status_code == 200
+
+
 def test_get_city_rating(client):
     response = client.get("/api1/cities/top")
     data = [ViewCity(**city) for city in response.json()]
     assert response.status_code == 200
     assert data[0].name == "Saint-Petersburg"
     assert data[1].name == "Moscow"
+
+
+def test_get_city_rating_with_cursor(client):
+    response = client.get("/api1/cities/top?limit=1")
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api1/cities/top?limit=1&cursor={cursor}")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Moscow"
+
+
+def test_get_cities_batch(client):
+    response = client.get("/api1/cities/batch?slugs=saint-petersburg,atlantis,moscow")
+    assert response.status_code == 200
+    assert [city["name"] for city in response.json()["cities"]] == [
+        "Saint-Petersburg",
+        "Moscow",
+    ]
+    assert response.json()["missing"] == ["atlantis"]
+
+
+def test_post_cities_batch_with_fields(client):
+    response = client.post("/api1/cities/batch?fields=rating", json=["moscow"])
+    assert response.status_code == 200
+    assert response.json() == {
+        "cities": [{"slug": "moscow", "rating": 4.56}],
+        "missing": [],
+    }
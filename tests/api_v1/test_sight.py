@@ -35,6 +35,13 @@ def test_list_all_sights_with_query(client):
     response = client.get("/api1/cities/moscow/sights?skip=1&limit=1")
     assert response.status_code == 200
     assert response.json()[0]["name"] == "Museum of Cosmonautics"
+    assert response.headers["X-Total-Count"] == "2"
+
+
+def test_list_sights_of_nonexistent_city(client):
+    response = client.get("/api1/cities/mmoscow/sights")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "City 'mmoscow' was not found"
 
 
 def test_add_sight(client):
@@ -59,6 +66,12 @@ def test_add_duplicate_sight(client):
     assert response.json()["detail"] == f"Sight '{test_sight['name']}' already exists"
 
 
+def test_add_sight_to_nonexistent_city(client):
+    response = client.post("/api1/cities/mmoscow/sights", json=test_sight)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "City 'mmoscow' was not found"
+
+
 def test_add_sight_without_required(client):
     response = client.post("/api1/cities/moscow/sights", json=corrupted_test_sight)
     assert response.status_code == 422
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from app.cache.redis import encode_command, read_reply
+
+
+def encode_reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedisServer:
+    def __init__(self):
+        self.data: dict[bytes, tuple[float | None, bytes]] = {}
+        self.subscribers: dict[bytes, list[asyncio.StreamWriter]] = {}
+        self.server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def lookup(self, key: bytes) -> bytes | None:
+        expires, value = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command, *args = await read_reply(reader)
+                writer.write(self.dispatch(command.upper(), args, writer))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+
+    def dispatch(self, command: bytes, args: list, writer) -> bytes:
+        if command in (b"PING", b"SELECT", b"AUTH"):
+            return encode_reply("OK")
+        if command == b"GET":
+            return encode_reply(self.lookup(args[0]))
+        if command == b"SET":
+            expires = None
+            if len(args) == 4 and args[2].upper() == b"PX":
+                expires = time.monotonic() + int(args[3]) / 1000
+            self.data[args[0]] = (expires, args[1])
+            return encode_reply("OK")
+        if command == b"DEL":
+            return encode_reply(
+                sum(self.data.pop(key, None) is not None for key in args)
+            )
+        if command == b"SUBSCRIBE":
+            self.subscribers.setdefault(args[0], []).append(writer)
+            return (
+                b"*3\r\n"
+                + encode_reply(b"subscribe")
+                + encode_reply(args[0])
+                + encode_reply(1)
+            )
+        if command == b"PUBLISH":
+            receivers = self.subscribers.get(args[0], [])
+            for receiver in receivers:
+                receiver.write(encode_command("message", args[0], args[1]))
+            return encode_reply(len(receivers))
+        return b"-ERR unknown command\r\n"
@@ -0,0 +1,171 @@
+import asyncio
+
+from bson import ObjectId
+
+from app.cache.loader import CachedLoader
+from app.cache.manager import CacheManager
+from app.cache.memory import MemoryCache
+from app.cache.redis import RedisCache, RedisConnection, RedisSubscriber
+
+from .fake_redis import FakeRedisServer
+
+
+def test_loader_coalesces_concurrent_misses():
+    loader = CachedLoader("city", MemoryCache(maxsize=10), ttl=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"slug": "moscow"}
+
+    async def run():
+        return await asyncio.gather(
+            *(loader.get_or_load("moscow", load) for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"slug": "moscow"} for result in results)
+    assert loader.stats() == {
+        "size": 1,
+        "maxsize": 10,
+        "hits": 0,
+        "misses": 5,
+        "hit_rate": 0.0,
+    }
+
+
+def test_loader_skips_store_after_invalidation():
+    loader = CachedLoader("city", MemoryCache(maxsize=10), ttl=60)
+
+    async def run():
+        async def load():
+            await loader.invalidate("moscow")
+            return {"slug": "moscow"}
+
+        await loader.get_or_load("moscow", load)
+        return await loader.peek("moscow")
+
+    assert asyncio.run(run()) is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+
+    async def run():
+        await cache.set("a", 1, ttl=60)
+        await cache.set("b", 2, ttl=60)
+        await cache.get("a")
+        await cache.set("c", 3, ttl=60)
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(run()) == (1, None, 3)
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(maxsize=2)
+
+    async def run():
+        await cache.set("a", 1, ttl=0)
+        return await cache.get("a")
+
+    assert asyncio.run(run()) is None
+
+
+def test_redis_cache_roundtrip():
+    async def run():
+        server = FakeRedisServer()
+        await server.start()
+        connection = RedisConnection(server.url)
+        cache = RedisCache(connection, prefix="city:")
+        document = {"_id": ObjectId(), "slug": "moscow"}
+        await cache.set("moscow", document, ttl=60)
+        stored = await cache.get("moscow")
+        await cache.delete("moscow")
+        deleted = await cache.get("moscow")
+        await connection.close()
+        await server.stop()
+        return document, stored, deleted
+
+    document, stored, deleted = asyncio.run(run())
+    assert stored == document
+    assert deleted is None
+
+
+def test_invalidation_is_broadcast_between_workers():
+    async def run():
+        server = FakeRedisServer()
+        await server.start()
+        workers = [CacheManager("memory", server.url, "invalidate") for _ in range(2)]
+        loaders = [worker.loader("city", maxsize=10, ttl=60) for worker in workers]
+        for worker in workers:
+            await worker.start()
+            await asyncio.wait_for(worker.subscriber.subscribed.wait(), 1)
+        for loader in loaders:
+            await loader.backend.set("moscow", {"slug": "moscow"}, ttl=60)
+        await loaders[0].invalidate("moscow")
+        await asyncio.sleep(0.05)
+        cached = [await loader.peek("moscow") for loader in loaders]
+        for worker in workers:
+            await worker.stop()
+        await server.stop()
+        return cached
+
+    assert asyncio.run(run()) == [None, None]
+
+
+def test_loader_falls_back_to_source_when_redis_is_down():
+    async def run():
+        server = FakeRedisServer()
+        await server.start()
+        url = server.url
+        await server.stop()
+        cache = RedisCache(RedisConnection(url), prefix="city:")
+        loader = CachedLoader("city", cache, ttl=60)
+
+        async def load():
+            return {"slug": "moscow"}
+
+        return await loader.get_or_load("moscow", load), await loader.peek("moscow")
+
+    assert asyncio.run(run()) == ({"slug": "moscow"}, None)
+
+
+def test_invalidate_survives_redis_being_down():
+    async def run():
+        server = FakeRedisServer()
+        await server.start()
+        url = server.url
+        await server.stop()
+        loader = CachedLoader("city", RedisCache(RedisConnection(url)), ttl=60)
+        await loader.invalidate("moscow")
+        return loader._pending
+
+    assert asyncio.run(run()) == {}
+
+
+def test_subscriber_survives_callback_errors():
+    async def run():
+        server = FakeRedisServer()
+        await server.start()
+        received = []
+
+        def callback(message: bytes):
+            received.append(message)
+            if len(received) == 1:
+                raise ValueError("malformed message")
+
+        subscriber = RedisSubscriber(server.url, "invalidate", callback, retry_delay=0)
+        task = asyncio.create_task(subscriber.run())
+        publisher = RedisConnection(server.url)
+        for message in (b"first", b"second"):
+            await asyncio.wait_for(subscriber.subscribed.wait(), 1)
+            await publisher.execute("PUBLISH", "invalidate", message)
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await publisher.close()
+        await server.stop()
+        return received
+
+    assert asyncio.run(run()) == [b"first", b"second"]
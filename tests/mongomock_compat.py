@@ -0,0 +1,13 @@
+import mongomock.collection
+import pytest
+
+
+@pytest.fixture
+def bulk_updates(monkeypatch):
+    # pymongo passes a sort option to bulk updates that mongomock does not take
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+    monkeypatch.setattr(
+        mongomock.collection.BulkOperationBuilder,
+        "add_update",
+        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs),
+    )
@@ -0,0 +1,58 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import CITY_COLLECTION
+from app.crud import bulk
+from app.models.bulk import BulkReport
+
+
+def sight(name: str) -> dict:
+    return {
+        "name": name,
+        "slug": name.lower(),
+        "description": "",
+        "rating": 4.0,
+        "number_of_scores": 0,
+    }
+
+
+def test_push_sights_reports_rows_lost_to_concurrent_writes():
+    collection = AsyncMongoMockClient()["test"][CITY_COLLECTION]
+    report = BulkReport()
+
+    async def run():
+        await collection.insert_one({"slug": "kazan", "sights": [sight("Kremlin")]})
+        inserted = await bulk.push_sights(
+            collection, "kazan", [(1, sight("Kremlin")), (2, sight("Bauman"))], report
+        )
+        missing = await bulk.push_sights(
+            collection, "atlantis", [(3, sight("Temple"))], report
+        )
+        city = await collection.find_one({"slug": "kazan"})
+        return inserted, missing, [item["slug"] for item in city["sights"]]
+
+    inserted, missing, slugs = asyncio.run(run())
+    assert (inserted, missing) == (1, 0)
+    assert sorted(slugs) == ["bauman", "kremlin"]
+    assert [(error.row, error.detail) for error in report.errors] == [
+        (1, "Sight 'Kremlin' already exists"),
+        (3, "City 'atlantis' was not found"),
+    ]
+
+
+def test_push_sights_guards_the_whole_group():
+    collection = AsyncMongoMockClient()["test"][CITY_COLLECTION]
+    report = BulkReport()
+
+    async def run():
+        await collection.insert_one({"slug": "omsk"})
+        inserted = await bulk.push_sights(
+            collection, "omsk", [(1, sight("Park")), (2, sight("Bridge"))], report
+        )
+        again = await bulk.push_sights(collection, "omsk", [(3, sight("Park"))], report)
+        city = await collection.find_one({"slug": "omsk"})
+        return inserted, again, len(city["sights"])
+
+    assert asyncio.run(run()) == (2, 0, 2)
+    assert [error.row for error in report.errors] == [3]
@@ -0,0 +1,117 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.api_v1.endpoints import city
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.etag import etag_matches, not_modified, set_etag
+from app.crud.leaderboard import leaderboards
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+
+@app.get("/text")
+def text(size: int):
+    return PlainTextResponse("x" * size)
+
+
+@app.get("/tagged")
+def tagged(request: Request, size: int):
+    if etag_matches(request, '"v1"'):
+        return not_modified('"v1"')
+    response = PlainTextResponse("x" * size)
+    set_etag(response, '"v1"')
+    return response
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse(iter([b"a" * 10, b"b" * 10]), media_type="text/plain")
+
+
+def test_negotiate_encoding_honours_quality():
+    assert negotiate_encoding("gzip;q=0.5, identity") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("") is None
+
+
+def test_middleware_compresses_above_threshold():
+    client = TestClient(app)
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/text?size=1000", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.text == "x" * 1000
+
+    response = client.get("/text?size=10", headers=headers)
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "x" * 10
+
+
+def test_middleware_compresses_streamed_bodies():
+    response = TestClient(app).get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert response.text == "a" * 10 + "b" * 10
+
+
+def test_middleware_tags_each_encoding_separately():
+    client = TestClient(app)
+    response = client.get("/tagged?size=1000", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == '"v1-gzip"'
+
+    response = client.get("/tagged?size=1000", headers={"Accept-Encoding": "identity"})
+    assert response.headers["ETag"] == '"v1"'
+    assert "Vary" not in response.headers
+
+    response = client.get("/tagged?size=10", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["ETag"] == '"v1"'
+    assert "Vary" not in response.headers
+
+    response = client.get(
+        "/tagged?size=1000",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1-gzip"'},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"v1-gzip"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_top_page_is_precompressed_with_encoded_etag(monkeypatch):
+    collection = AsyncMongoMockClient()["test"]["city_top_page"]
+    leaderboards.pop(collection.name, None)
+    monkeypatch.setattr(city.top_page_cache, "minimum_size", 100)
+    asyncio.run(
+        collection.insert_many(
+            [
+                {"name": f"City {i}", "slug": f"city-{i}", "rating": i, "version": 1}
+                for i in range(20)
+            ]
+        )
+    )
+    top = FastAPI()
+    top.include_router(city.router)
+    top.dependency_overrides[city.get_read_conn_for_city] = lambda: collection
+    client = TestClient(top)
+
+    plain = client.get("/cities/top", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert "Vary" not in plain.headers
+    assert plain.json()[0]["name"] == "City 19"
+
+    response = client.get("/cities/top", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert response.json() == plain.json()
+
+    response = client.get(
+        "/cities/top",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
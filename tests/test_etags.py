@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.api_v1.endpoints import city, sight
+from app.core.config import CITY_COLLECTION
+from app.crud import sight as crud_sight
+from app.crud.leaderboard import leaderboards
+from app.db.base import get_sight_collection
+from app.db.dependencies import get_mongodb_conn_for_city
+
+red_square = {"name": "Red Square", "description": "Main square", "rating": 4.9}
+
+
+@pytest.fixture(params=["embedded", "collection"])
+def client(request, monkeypatch):
+    monkeypatch.setattr(crud_sight, "SIGHT_STORAGE", request.param)
+    collection = AsyncMongoMockClient()["test_etags"][CITY_COLLECTION]
+    leaderboards.pop(collection.name, None)
+
+    async def seed():
+        await collection.delete_many({})
+        await get_sight_collection(collection).delete_many({})
+        await collection.insert_many(
+            [
+                {
+                    "name": name.title(),
+                    "slug": name,
+                    "description": f"{name.title()} city",
+                    "rating": rating,
+                    "version": 1,
+                }
+                | ({"sights": []} if request.param == "embedded" else {})
+                for name, rating in (("kazan", 4.5), ("omsk", 4.0))
+            ]
+        )
+
+    asyncio.run(seed())
+    app = FastAPI()
+    app.include_router(city.router)
+    app.include_router(sight.router)
+    app.dependency_overrides[get_mongodb_conn_for_city] = lambda: collection
+    yield TestClient(app)
+    leaderboards.pop(collection.name, None)
+
+
+def revalidate(client: TestClient, url: str, etag: str):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def test_sight_reads_answer_304_until_a_sight_write(client):
+    sights, red_square_url = "/cities/kazan/sights", "/cities/kazan/sight/red-square"
+    assert client.post(sights, json=red_square).status_code == 201
+    response = client.get(sights)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    # Both reads are tagged by the city's version
+    assert revalidate(client, sights, etag).status_code == 304
+    assert revalidate(client, red_square_url, etag).status_code == 304
+
+    kremlin = red_square | {"name": "Kremlin"}
+    assert client.post(sights, json=kremlin).status_code == 201
+    response = revalidate(client, sights, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+    assert (
+        revalidate(client, red_square_url, response.headers["ETag"]).status_code == 304
+    )
+
+
+def test_sight_write_changes_the_city_tag(client):
+    response = client.get("/cities/kazan")
+    etag = response.headers["ETag"]
+    assert revalidate(client, "/cities/kazan", etag).status_code == 304
+
+    assert client.post("/cities/kazan/sights", json=red_square).status_code == 201
+    response = revalidate(client, "/cities/kazan", etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [item["name"] for item in response.json()["sights"]] == ["Red Square"]
+    etag = response.headers["ETag"]
+
+    assert client.delete("/cities/kazan/sight/red-square").status_code == 200
+    assert revalidate(client, "/cities/kazan", etag).status_code == 200
+
+
+def test_top_answers_304_until_the_ranking_changes(client):
+    response = client.get("/cities/top")
+    etag = response.headers["ETag"]
+    assert revalidate(client, "/cities/top", etag).status_code == 304
+
+    assert client.put("/cities/omsk", json={"rating": 5.0}).status_code == 200
+    response = revalidate(client, "/cities/top", etag)
+    assert response.status_code == 200
+    assert response.json()[0]["slug"] == "omsk"
+
+
+def test_sight_page_is_tagged_by_the_read_that_produced_it(client):
+    # The cached city is ahead of the node serving the page, as with a
+    # lagging secondary
+    response = client.get("/cities/kazan")
+    cached = response.headers["ETag"]
+    collection = client.app.dependency_overrides[get_mongodb_conn_for_city]()
+    asyncio.run(collection.update_one({"slug": "kazan"}, {"$set": {"version": 0}}))
+
+    response = client.get("/cities/kazan/sights")
+    assert response.status_code == 200
+    assert response.headers["ETag"] != cached
+    assert response.headers["ETag"].endswith('-0"')
+    assert revalidate(client, "/cities/kazan/sights", cached).status_code == 304
+
+
+def test_top_returns_only_requested_fields(client):
+    response = client.get("/cities/top?fields=slug")
+    assert response.json() == [{"slug": "kazan"}, {"slug": "omsk"}]
+
+    schema = client.get("/openapi.json").json()
+    examples = schema["paths"]["/cities/top"]["get"]["responses"]["400"]["content"]
+    assert set(examples["application/json"]["examples"]) == {"cursor", "fields"}
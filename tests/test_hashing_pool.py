@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import HashingPool
+
+
+def test_hashing_pool_rejects_when_saturated():
+    pool = HashingPool(workers=1, queue_depth=0)
+
+    async def run():
+        return await asyncio.gather(
+            pool.run(time.sleep, 0.05), pool.run(time.sleep, 0.05)
+        )
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(run())
+    assert e.value.status_code == 503
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+def test_hashing_pool_records_timings():
+    pool = HashingPool(workers=2, queue_depth=2)
+    assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["inflight"] == 0
+    pool.shutdown()
+
+
+def test_hashing_pool_holds_slot_until_cancelled_hash_finishes():
+    pool = HashingPool(workers=1, queue_depth=0)
+
+    async def run():
+        task = asyncio.create_task(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException):
+            await pool.run(pow, 2, 10)
+        await asyncio.sleep(0.2)
+        return await pool.run(pow, 2, 10)
+
+    assert asyncio.run(run()) == 1024
+    assert pool.stats()["inflight"] == 0
+    pool.shutdown()
@@ -0,0 +1,43 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import IndexModel
+
+from app.core.config import CITY_COLLECTION, USER_COLLECTION
+from app.db.base import IndexManager, same_index
+
+
+def test_same_index_compares_keys_and_options():
+    declared = IndexModel("slug", name="slug_1", unique=True).document
+    assert same_index(declared, {"key": [("slug", 1)], "unique": True, "v": 2})
+    assert not same_index(declared, {"key": [("slug", 1)], "v": 2})
+    assert not same_index(declared, {"key": [("slug", -1)], "unique": True})
+
+
+def test_same_index_compares_text_weights():
+    declared = IndexModel(
+        [("name", "text")], name="city_text", weights={"name": 10}
+    ).document
+    live = {"key": [("_fts", "text"), ("_ftsx", 1)], "weights": {"name": 10}}
+    assert same_index(declared, live)
+    assert not same_index(declared, live | {"weights": {"name": 1}})
+
+
+def test_background_sync_builds_unique_indexes_first():
+    database = AsyncMongoMockClient()["test_indexes"]
+    manager = IndexManager()
+
+    async def run():
+        await manager.sync(database, background=True)
+        unique = {
+            name: await database[name].index_information()
+            for name in (CITY_COLLECTION, USER_COLLECTION)
+        }
+        await manager._task
+        return unique
+
+    unique = asyncio.run(run())
+    assert unique[CITY_COLLECTION]["slug_1"]["unique"]
+    assert "city_text" not in unique[CITY_COLLECTION]
+    assert unique[USER_COLLECTION]["username_1"]["unique"]
+    assert "city_text" in manager.status[CITY_COLLECTION]["built"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.pagination import InvalidCursor, encode_cursor
+from app.crud.city import get_cities_by_rating
+from app.crud.leaderboard import Leaderboard, get_leaderboard, leaderboards
+
+
+def test_leaderboard_orders_by_rating_then_id():
+    leaderboard = Leaderboard(collection=None)
+    ids = [ObjectId() for _ in range(4)]
+    for city_id, rating in zip(ids, [4.5, 4.9, 4.5, 3.0]):
+        leaderboard.upsert(city_id, rating)
+    assert leaderboard.page(limit=10) == [ids[1], ids[0], ids[2], ids[3]]
+    assert leaderboard.page(limit=2, skip=1) == [ids[0], ids[2]]
+    assert leaderboard.page(limit=2, after=(4.5, ids[0])) == [ids[2], ids[3]]
+
+
+def test_leaderboard_updates_incrementally():
+    leaderboard = Leaderboard(collection=None)
+    first, second = ObjectId(), ObjectId()
+    leaderboard.upsert(first, 4.0)
+    leaderboard.upsert(second, 3.0)
+    leaderboard.upsert(second, 5.0)
+    assert leaderboard.page(limit=10) == [second, first]
+    leaderboard.remove(second)
+    assert leaderboard.page(limit=10) == [first]
+    assert len(leaderboard) == 1
+
+
+def city_collection(name: str, ratings: list[float]):
+    collection = AsyncMongoMockClient()["test"][name]
+    leaderboards.pop(name, None)
+
+    async def seed():
+        result = await collection.insert_many(
+            [{"name": f"city{i}", "rating": rating} for i, rating in enumerate(ratings)]
+        )
+        return result.inserted_ids
+
+    return collection, seed
+
+
+def test_rating_page_tops_up_cities_deleted_out_of_band():
+    collection, seed = city_collection("top_up", [5.0, 4.0, 3.0])
+
+    async def run():
+        ids = await seed()
+        await get_cities_by_rating(collection, limit=2, skip=0)
+        await collection.delete_one({"_id": ids[0]})
+        cities = await get_cities_by_rating(collection, limit=2, skip=0)
+        return [city["_id"] for city in cities], ids
+
+    page, ids = asyncio.run(run())
+    assert page == [ids[1], ids[2]]
+    assert len(leaderboards["top_up"]) == 2
+
+
+def test_rating_cursor_rejects_non_numeric_rating():
+    collection, _ = city_collection("bad_cursor", [])
+    cursor = encode_cursor("high", ObjectId())
+    with pytest.raises(InvalidCursor):
+        asyncio.run(get_cities_by_rating(collection, limit=2, skip=0, cursor=cursor))
+
+
+def test_stale_leaderboard_is_rebuilt_in_background():
+    collection, seed = city_collection("stale", [4.0])
+
+    async def run():
+        await seed()
+        leaderboard = get_leaderboard(collection)
+        await leaderboard.ensure_ready()
+        leaderboard.ttl = 0.01
+        new = await collection.insert_one({"name": "outsider", "rating": 5.0})
+        await asyncio.sleep(0.02)
+        await leaderboard.ensure_ready()
+        await leaderboard._rebuild_task
+        return leaderboard.page(limit=1), new.inserted_id
+
+    page, new_id = asyncio.run(run())
+    assert page == [new_id]
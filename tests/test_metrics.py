@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.metrics import profiler
+from app.metrics.monitoring import CommandTimer
+from app.metrics.registry import MetricsRegistry
+from app.metrics.timing import RequestTiming, current_timing
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency", "Latency", ("route",), buckets=(1, 2))
+    histogram.observe(0.5, "/cities")
+    histogram.observe(1.5, "/cities")
+    histogram.observe(3, "/cities")
+    lines = registry.exposition().splitlines()
+    assert lines[:2] == ["# HELP latency Latency", "# TYPE latency histogram"]
+    assert lines[2:] == [
+        'latency_bucket{route="/cities",le="1"} 1',
+        'latency_bucket{route="/cities",le="2"} 2',
+        'latency_bucket{route="/cities",le="+Inf"} 3',
+        'latency_sum{route="/cities"} 5.0',
+        'latency_count{route="/cities"} 3',
+    ]
+
+
+def test_command_timer_adds_to_current_request():
+    timing = RequestTiming()
+    token = current_timing.set(timing)
+    try:
+        event = SimpleNamespace(command_name="find", request_id=1, duration_micros=1500)
+        CommandTimer().succeeded(event)
+        CommandTimer().succeeded(event)
+    finally:
+        current_timing.reset(token)
+    assert timing.db_seconds == 0.003
+
+
+def test_profiled_logs_slow_query_with_plan(monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "SLOW_QUERY_MS", 5)
+    monkeypatch.setattr(profiler, "SLOW_QUERY_EXPLAIN_RATE", 1)
+
+    class FakeDatabase:
+        async def command(self, command):
+            assert "lsid" not in command["explain"]
+            return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+
+    collection = SimpleNamespace(database=FakeDatabase())
+    command = {"find": "city", "filter": {"rating": {"$gt": 4}}, "lsid": {}}
+
+    @profiler.profiled
+    async def find_cities(collection):
+        profiler.command_started(1, "find", command)
+        profiler.command_finished(1, 0.01)
+        profiler.command_started(2, "find", command)
+        profiler.command_finished(2, 0.001)
+
+    asyncio.run(find_cities(collection))
+    records = [r.getMessage() for r in caplog.records if "slow query" in r.message]
+    assert len(records) == 1
+    assert '"filter": {"rating": {"$gt": 4}}' in records[0]
+    assert "COLLSCAN" in records[0]
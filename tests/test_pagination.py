@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.pagination import InvalidCursor, encode_cursor
+from app.crud.city import city_list_cursor, get_all_cities
+
+
+def test_list_cursor_pages_by_id():
+    collection = AsyncMongoMockClient()["test"]["city_pages"]
+
+    async def run():
+        await collection.delete_many({})
+        await collection.insert_many([{"slug": f"city-{i}"} for i in range(3)])
+        first = await get_all_cities(collection, limit=2, skip=0, search=None)
+        cursor = city_list_cursor(first[-1])
+        return await get_all_cities(
+            collection, limit=2, skip=0, search=None, cursor=cursor
+        )
+
+    assert [city["slug"] for city in asyncio.run(run())] == ["city-2"]
+
+
+@pytest.mark.parametrize("value", ["zzz", 5, None, [str(ObjectId())]])
+def test_list_cursor_rejects_non_id_values(value):
+    collection = AsyncMongoMockClient()["test"]["city_pages"]
+    with pytest.raises(InvalidCursor):
+        asyncio.run(
+            get_all_cities(
+                collection, limit=2, skip=0, search=None, cursor=encode_cursor(value)
+            )
+        )
@@ -0,0 +1,29 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+
+from app.crud.leaderboard import get_leaderboard, leaderboards
+from app.db.base import with_primary
+
+
+def collection(read_preference=ReadPreference.PRIMARY):
+    client = AsyncIOMotorClient("mongodb://localhost", connect=False)
+    return client["test"].get_collection("city_reads", read_preference=read_preference)
+
+
+def test_with_primary_keeps_primary_collections():
+    primary = collection()
+    assert with_primary(primary) is primary
+
+
+def test_with_primary_reroutes_secondary_reads():
+    secondary = collection(ReadPreference.SECONDARY_PREFERRED)
+    primary = with_primary(secondary)
+    assert primary.read_preference == ReadPreference.PRIMARY
+    assert primary.name == secondary.name
+
+
+def test_leaderboard_is_built_from_the_primary():
+    leaderboards.pop("city_reads", None)
+    leaderboard = get_leaderboard(collection(ReadPreference.SECONDARY_PREFERRED))
+    assert leaderboard.collection.read_preference == ReadPreference.PRIMARY
+    leaderboards.pop("city_reads", None)
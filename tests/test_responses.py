@@ -0,0 +1,34 @@
+import json
+
+from bson import ObjectId
+
+from app.core.responses import FastJSONResponse, response_dumper
+from app.models.city import CitySummary, ViewCity
+from app.models.user import FullDBUser
+
+
+def test_dumper_matches_validated_output():
+    city = {
+        "_id": ObjectId(),
+        "slug": "moscow",
+        "name": "Moscow",
+        "description": "Capital",
+        "rating": 4.5,
+        "sights": [{"name": "Red Square", "description": "Square", "slug": "rs"}],
+    }
+    dump = response_dumper(ViewCity, exclude_unset=False)
+    assert dump(city) == ViewCity(**city).dict(by_alias=True)
+
+
+def test_dumper_respects_exclude_unset_for_lists():
+    dump = response_dumper(list[CitySummary], exclude_unset=True)
+    assert dump([{"_id": ObjectId(), "slug": "kazan", "rating": 4.0}]) == [
+        {"slug": "kazan", "rating": 4.0}
+    ]
+
+
+def test_fast_response_encodes_object_ids():
+    user_id = ObjectId()
+    dump = response_dumper(FullDBUser, exclude_unset=True)
+    response = FastJSONResponse(dump({"_id": user_id, "username": "bob"}))
+    assert json.loads(response.body) == {"_id": str(user_id), "username": "bob"}
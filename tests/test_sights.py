@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import CITY_COLLECTION, CITY_TEST_COLLECTION
+from app.crud import bulk, city, sight
+from app.crud.sight_collection import get_sights_by_city_slug
+from app.db.base import get_sight_collection
+from app.db.migrations import migrate_embedded_sights
+from app.models.bulk import BulkReport
+from app.models.city import UpdateCity, ViewCity
+from app.models.sight import ViewSight
+from tests.mongomock_compat import bulk_updates  # noqa: F401
+
+sight_document = ViewSight(name="Red Square", description="Main square", rating=4.9)
+
+
+@pytest.fixture(params=["embedded", "collection"])
+def storage(request, monkeypatch):
+    for module in (bulk, city, sight):
+        monkeypatch.setattr(module, "SIGHT_STORAGE", request.param)
+    return request.param
+
+
+def test_insert_sight_into_missing_city_returns_none(storage):
+    collection = AsyncMongoMockClient()["test"][CITY_COLLECTION]
+    result = asyncio.run(
+        sight.insert_sight_and_return(collection, f"atlantis-{storage}", sight_document)
+    )
+    assert result is None
+
+
+def test_city_detail_includes_collection_sights(storage):
+    collection = AsyncMongoMockClient()["test"][CITY_COLLECTION]
+    slug = f"kazan-{storage}"
+
+    async def run():
+        await collection.insert_one({"name": "Kazan", "slug": slug, "sights": []})
+        await sight.insert_sight_and_return(collection, slug, sight_document)
+        city = await collection.find_one({"slug": slug})
+        return await sight.get_city_with_sights(collection, city)
+
+    city = asyncio.run(run())
+    assert [item["name"] for item in city["sights"]] == ["Red Square"]
+
+
+def empty_collection(name: str):
+    collection = AsyncMongoMockClient()["test"][name]
+
+    async def clear():
+        await collection.delete_many({})
+        await get_sight_collection(collection).delete_many({})
+
+    asyncio.run(clear())
+    return collection
+
+
+def test_city_writes_move_sights_to_the_sight_collection(monkeypatch):
+    for module in (bulk, city, sight):
+        monkeypatch.setattr(module, "SIGHT_STORAGE", "collection")
+    collection = empty_collection(CITY_COLLECTION)
+    kremlin = {"name": "Kremlin", "description": "Fortress"}
+
+    async def run():
+        await city.insert_city_and_return(
+            collection, ViewCity(name="Moscow", description="", sights=[kremlin])
+        )
+        inserted = await get_sights_by_city_slug(collection, "moscow", 10, 0)
+        stored = await collection.find_one({"slug": "moscow"})
+        await city.update_city_and_return(
+            collection, "moscow", UpdateCity(name="Moskva", sights=[sight_document])
+        )
+        updated = await get_sights_by_city_slug(collection, "moskva", 10, 0)
+        kazan = ViewCity(name="Kazan", description="", sights=[kremlin]).dict()
+        await bulk.write_cities(
+            collection, [(1, kazan | {"slug": "kazan"}, {})], BulkReport()
+        )
+        city_doc = await collection.find_one({"slug": "kazan"})
+        detail = await sight.get_city_with_sights(collection, city_doc)
+        return inserted, stored, updated, detail
+
+    inserted, stored, updated, detail = asyncio.run(run())
+    assert [item["slug"] for item in inserted[0]] == ["kremlin"]
+    assert stored["sights"] == []
+    assert [item["slug"] for item in updated[0]] == ["red-square"]
+    assert [item["name"] for item in detail["sights"]] == ["Kremlin"]
+
+
+def test_migrate_embedded_sights_in_batches_and_resumes(bulk_updates):
+    collection = empty_collection(CITY_TEST_COLLECTION)
+    sights = get_sight_collection(collection)
+
+    def embedded(name: str) -> dict:
+        return {"name": name, "slug": name.lower(), "rating": 4.0}
+
+    async def run():
+        await collection.insert_many(
+            [
+                {"slug": "kazan", "version": 1, "sights": [embedded("Kremlin")]},
+                {
+                    "slug": "omsk",
+                    "version": 1,
+                    "sights": [embedded("Park"), embedded("Bridge")],
+                },
+                {"slug": "perm", "version": 1, "sights": []},
+            ]
+        )
+        # An interrupted run may already have copied a sight without pulling it
+        await sights.insert_one(embedded("Park") | {"city_slug": "omsk"})
+        first = await migrate_embedded_sights(collection, batch_size=1)
+        second = await migrate_embedded_sights(collection, batch_size=1)
+        cities = await collection.find({}, {"_id": 0}).sort("slug").to_list(None)
+        copied = await sights.find({}, {"_id": 0, "city_slug": 1, "slug": 1}).to_list(
+            None
+        )
+        return first, second, cities, copied
+
+    first, second, cities, copied = asyncio.run(run())
+    assert (first, second) == (3, 0)
+    assert [(c["slug"], c["sights"], c["version"]) for c in cities] == [
+        ("kazan", [], 2),
+        ("omsk", [], 2),
+        ("perm", [], 1),
+    ]
+    assert sorted((s["city_slug"], s["slug"]) for s in copied) == [
+        ("kazan", "kremlin"),
+        ("omsk", "bridge"),
+        ("omsk", "park"),
+    ]
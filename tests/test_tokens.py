@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from pymongo import ReadPreference
+
+from app.core import security
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(security, "SECRET_KEY", "test-secret")
+
+
+class FakeUserCollection:
+    name = "test_user"
+    read_preference = ReadPreference.PRIMARY
+
+    def __init__(self, user: dict):
+        self.user = user
+
+    async def find_one(self, query: dict, projection: dict | None = None):
+        if query["username"] == self.user["username"]:
+            return dict(self.user)
+
+
+def test_claims_token_carries_flags(monkeypatch):
+    monkeypatch.setattr(security, "ACCESS_TOKEN_MODE", "claims")
+    user = {"username": "claims1", "active": True, "staff": True, "token_version": 3}
+    token = security.create_user_access_token(user)
+    claims = jwt.get_unverified_claims(token)
+    assert (claims["active"], claims["staff"], claims["ver"]) == (True, True, 3)
+    principal = asyncio.run(security.get_current_user(FakeUserCollection(user), token))
+    assert principal == {"username": "claims1", "active": True, "staff": True}
+
+
+def test_claims_token_rejected_after_version_bump(monkeypatch):
+    monkeypatch.setattr(security, "ACCESS_TOKEN_MODE", "claims")
+    user = {"username": "claims2", "active": True, "staff": False}
+    token = security.create_user_access_token(user)
+    collection = FakeUserCollection(user | {"token_version": 1})
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(security.get_current_user(collection, token))
+    assert e.value.status_code == 401
+
+
+def test_lookup_token_rejected_after_version_bump():
+    user = {"username": "lookup1", "active": True, "staff": False}
+    token = security.create_user_access_token(user)
+    assert asyncio.run(security.get_current_user(FakeUserCollection(user), token))
+    collection = FakeUserCollection(user | {"token_version": 1, "username": "lookup2"})
+    token = security.create_user_access_token(user | {"username": "lookup2"})
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(security.get_current_user(collection, token))
+    assert e.value.status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token():
+    user = {"username": "refresh1", "active": True, "staff": False}
+    collection = FakeUserCollection(user)
+    token = security.create_refresh_token(user)
+    assert asyncio.run(security.authenticate_refresh_token(collection, token))
+    with pytest.raises(HTTPException):
+        asyncio.run(security.get_current_user(collection, token))
+    access_token = security.create_user_access_token(user)
+    with pytest.raises(HTTPException):
+        asyncio.run(security.authenticate_refresh_token(collection, access_token))
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.crud import user as crud_user
+from app.crud.user import (
+    CityListLimitExceeded,
+    compact_city_list,
+    update_user_and_return,
+)
+from app.db.migrations import compact_user_city_lists
+from app.models.user import UpdateUser
+from tests.mongomock_compat import bulk_updates  # noqa: F401
+
+
+@pytest.fixture
+def users(monkeypatch):
+    monkeypatch.setattr(crud_user, "USER_CITY_LIST_LIMIT", 3)
+    collection = AsyncMongoMockClient()["test"]["user"]
+    asyncio.run(collection.delete_many({}))
+    return collection
+
+
+def update(collection, username: str, **fields) -> dict:
+    async def run():
+        user = await collection.find_one({"username": username})
+        return await update_user_and_return(collection, user, UpdateUser(**fields))
+
+    return asyncio.run(run())
+
+
+def test_compact_city_list_dedupes_in_order():
+    assert compact_city_list(["moscow", "kazan", "moscow", "omsk"], 10) == [
+        "moscow",
+        "kazan",
+        "omsk",
+    ]
+
+
+def test_compact_city_list_keeps_newest_under_limit():
+    assert compact_city_list(["moscow", "kazan", "omsk", "kazan"], 2) == [
+        "kazan",
+        "omsk",
+    ]
+    assert compact_city_list(["moscow"], 0) == []
+
+
+def test_update_sets_email_without_touching_lists(users):
+    asyncio.run(
+        users.insert_one(
+            {"username": "anna", "email": "old@example.com", "visited_cities": ["omsk"]}
+        )
+    )
+    user = update(users, "anna", email="new@example.com")
+    assert user["email"] == "new@example.com"
+    assert user["visited_cities"] == ["omsk"]
+
+    user = update(users, "anna", visited_cities=["kazan"])
+    assert user["email"] == "new@example.com"
+
+
+def test_update_adds_and_removes_slugs(users):
+    asyncio.run(users.insert_one({"username": "anna", "visited_cities": ["omsk"]}))
+    user = update(users, "anna", visited_cities=["kazan", "omsk", "kazan"])
+    assert user["visited_cities"] == ["omsk", "kazan"]
+
+    user = update(users, "anna", remove_visited_cities=["omsk"])
+    assert user["visited_cities"] == ["kazan"]
+
+    # Removing from and adding to the same list happens in one update
+    user = update(
+        users,
+        "anna",
+        visited_cities=["perm", "tver"],
+        remove_visited_cities=["kazan", "tver"],
+        like_to_visit=["sochi"],
+    )
+    assert user["visited_cities"] == ["perm"]
+    assert user["like_to_visit"] == ["sochi"]
+
+
+def test_update_enforces_the_cap_against_stored_lists(users):
+    asyncio.run(
+        users.insert_one({"username": "anna", "visited_cities": ["omsk", "kazan"]})
+    )
+    # A profile read before a concurrent update still hits the stored list
+    stale = asyncio.run(users.find_one({"username": "anna"}))
+    update(users, "anna", visited_cities=["perm"])
+    with pytest.raises(CityListLimitExceeded):
+        asyncio.run(
+            update_user_and_return(users, stale, UpdateUser(visited_cities=["tver"]))
+        )
+
+    # A rejected edit leaves removals and other fields unapplied too
+    with pytest.raises(CityListLimitExceeded):
+        update(
+            users,
+            "anna",
+            email="new@example.com",
+            visited_cities=["tver", "sochi"],
+            remove_visited_cities=["omsk"],
+        )
+    stored = asyncio.run(users.find_one({"username": "anna"}))
+    assert stored["visited_cities"] == ["omsk", "kazan", "perm"]
+    assert "email" not in stored
+
+    user = update(
+        users, "anna", visited_cities=["tver"], remove_visited_cities=["omsk"]
+    )
+    assert user["visited_cities"] == ["kazan", "perm", "tver"]
+
+
+def test_update_lets_lists_over_the_cap_shrink(users):
+    slugs = ["a", "b", "c", "d", "e"]
+    asyncio.run(users.insert_one({"username": "anna", "like_to_visit": slugs}))
+    user = update(users, "anna", like_to_visit=["f"], remove_like_to_visit=["a", "b"])
+    assert user["like_to_visit"] == ["c", "d", "e", "f"]
+    with pytest.raises(CityListLimitExceeded):
+        update(users, "anna", like_to_visit=["g"])
+
+
+def test_compact_user_city_lists(users, bulk_updates):
+    asyncio.run(
+        users.insert_many(
+            [
+                {"username": "anna", "visited_cities": ["a", "b", "a", "c", "d"]},
+                {"username": "boris", "visited_cities": ["a"], "like_to_visit": []},
+                {"username": "vera"},
+            ]
+        )
+    )
+    assert asyncio.run(compact_user_city_lists(users, limit=3, batch_size=1)) == 1
+    anna = asyncio.run(users.find_one({"username": "anna"}))
+    assert anna["visited_cities"] == ["b", "c", "d"]
+    assert asyncio.run(compact_user_city_lists(users, limit=3)) == 0
+
+
+def test_update_treats_slugs_as_literals(users):
+    asyncio.run(users.insert_one({"username": "anna", "visited_cities": ["omsk"]}))
+    user = update(users, "anna", visited_cities=["$username"])
+    assert user["visited_cities"] == ["omsk", "$username"]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.api_v1.endpoints import user
+from app.db.dependencies import get_mongodb_conn_for_city, get_mongodb_conn_for_user
+
+profile = {
+    "username": "anna",
+    "password": "hashed",
+    "email": "anna@example.com",
+    "visited_cities": ["kazan", "moscow", "atlantis"],
+    "like_to_visit": ["moscow", "omsk", "perm"],
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(user, "USER_EXPAND_MAX_CITIES", 3)
+    database = AsyncMongoMockClient()["test_profile"]
+    users, cities = database["user"], database["city"]
+
+    async def seed():
+        await users.delete_many({})
+        await cities.delete_many({})
+        await users.insert_one(dict(profile))
+        await cities.insert_many(
+            [
+                {"name": name.title(), "slug": name, "rating": 4.0, "sights": []}
+                for name in ("moscow", "kazan", "omsk", "perm")
+            ]
+        )
+
+    asyncio.run(seed())
+    app = FastAPI()
+    app.include_router(user.router)
+    app.dependency_overrides[get_mongodb_conn_for_user] = lambda: users
+    app.dependency_overrides[get_mongodb_conn_for_city] = lambda: cities
+    return TestClient(app)
+
+
+def test_profile_without_expand_keeps_slugs(client):
+    response = client.get("/users/users/anna")
+    assert response.status_code == 200
+    assert response.json() == {
+        "username": "anna",
+        "email": "anna@example.com",
+        "visited_cities": profile["visited_cities"],
+        "like_to_visit": profile["like_to_visit"],
+    }
+
+
+def test_profile_expands_cities(client):
+    response = client.get("/users/users/anna?expand=cities")
+    assert response.status_code == 200
+    data = response.json()
+    assert "password" not in data
+    # Order is kept per list and a city in both lists is expanded in each
+    assert [city["slug"] for city in data["visited_cities"]] == ["kazan", "moscow"]
+    assert [city["slug"] for city in data["like_to_visit"]] == ["moscow"]
+    assert data["visited_cities"][0]["name"] == "Kazan"
+    # Missing cities and those past USER_EXPAND_MAX_CITIES stay slugs
+    assert data["unexpanded_cities"] == ["atlantis", "omsk", "perm"]
+
+
+def test_profile_of_missing_user(client):
+    response = client.get("/users/users/boris?expand=cities")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "User 'boris' was not found"